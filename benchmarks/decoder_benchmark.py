@@ -0,0 +1,74 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import argparse
+import gzip
+import json
+import random
+import timeit
+
+from services.decoder import Decoder, msgspec, orjson
+
+
+def synthesize_frames(count: int, levels: int) -> list:
+    """
+    Build board snapshot frames shaped like the lightning_board_snapshot channel.
+    :param count: The number of frames.
+    :param levels: The number of price levels per side.
+    :return: A list of raw frames.
+    """
+    frames = []
+    for _ in range(count):
+        mid_price = random.randint(9_000_000, 11_000_000)
+        frames.append(json.dumps({
+            "jsonrpc": "2.0",
+            "method": "channelMessage",
+            "params": {
+                "channel": "lightning_board_snapshot_FX_BTC_JPY",
+                "message": {
+                    "mid_price": mid_price,
+                    "bids": [{"price": mid_price - i - 1, "size": round(random.random(), 8)} for i in range(levels)],
+                    "asks": [{"price": mid_price + i + 1, "size": round(random.random(), 8)} for i in range(levels)],
+                },
+            },
+        }))
+    return frames
+
+
+def load_frames(path: str) -> list:
+    """
+    Load recorded frames, one raw frame per line.
+    Tick recorder segments (`*.jsonl.gz`) are read as well, without their receive time prefix.
+    :param path: The path of the recorded frames.
+    :return: A list of raw frames.
+    """
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return [line.rstrip('\n').split('\t', 1)[1] for line in f if line.strip()]
+    with open(path, encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def main() -> None:
+    """Measure the per-frame decode cost of every installed decoder backend."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--frames', help='A file of recorded frames, one per line, or a tick recorder segment. Synthetic snapshots are used if omitted.')
+    parser.add_argument('--count', type=int, default=200, help='The number of synthetic frames.')
+    parser.add_argument('--levels', type=int, default=1000, help='The number of price levels per side of synthetic frames.')
+    parser.add_argument('--repeat', type=int, default=5, help='The number of passes over the frames.')
+    args = parser.parse_args()
+    
+    frames = load_frames(args.frames) if args.frames else synthesize_frames(args.count, args.levels)
+    average_size = sum(len(frame) for frame in frames) / len(frames)
+    print(f"{len(frames)} frames, {average_size / 1024:.1f} KiB per frame on average")
+    
+    backends = [backend for backend, module in (('msgspec', msgspec), ('orjson', orjson), ('json', True)) if module is not None]
+    for backend in backends:
+        decode = Decoder(backend).decode
+        elapsed = min(timeit.repeat(lambda: [decode(frame) for frame in frames], number=1, repeat=args.repeat))
+        print(f"{backend:>8}: {elapsed / len(frames) * 1e6:10.1f} us per frame")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
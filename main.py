@@ -27,28 +27,61 @@ class ApplicationContainer(containers.DeclarativeContainer):
     )
     
     # Services
-    exchange_client = providers.Factory(
+    exchange_client = providers.Singleton(
         services.ExchangeClient,
         base_url=config.bitflyer_api_base_url,
         api_key=config.bitflyer_api_key,
-        api_secret=config.bitflyer_api_secret
+        api_secret=config.bitflyer_api_secret,
+        timeout=config.bitflyer_api_timeout,
+        max_concurrency=config.bitflyer_api_max_concurrency
+    )
+    
+    latency = providers.Singleton(services.LatencyRecorder)
+    
+    event_bus = providers.Singleton(
+        services.EventBus,
+        max_size=config.event_bus_max_size
+    )
+    
+    metrics = providers.Singleton(services.MetricsRegistry)
+    
+    watchdog = providers.Singleton(
+        services.Watchdog,
+        interval_ms=config.watchdog_interval_ms,
+        threshold_ms=config.watchdog_threshold_ms
+    )
+    
+    decoder = providers.Singleton(
+        services.Decoder,
+        backend=config.stream_decoder
     )
     
     stream = providers.Singleton(
         services.Stream,
         url=config.bitflyer_websocket_url,
         api_key=config.bitflyer_api_key,
-        api_secret=config.bitflyer_api_secret
+        api_secret=config.bitflyer_api_secret,
+        queue_size=config.stream_queue_size
     )
     
-    logger = providers.Singleton(services.Logger)
+    logger = providers.Singleton(
+        services.Logger,
+        queue_size=config.log_queue_size,
+        max_bytes=config.log_max_bytes,
+        backup_count=config.log_backup_count,
+        rotate_interval=config.log_rotate_interval,
+        json_lines=config.log_json_lines
+    )
     
     batch = providers.Singleton(
         services.Batch,
         tasks=providers.List(
             providers.Factory(batch_tasks.HealthCheckTask),
             providers.Factory(batch_tasks.NotificationTask),
+            providers.Factory(batch_tasks.ReconciliationTask),
+            providers.Factory(batch_tasks.ModelUpdateTask),
         ),
+        max_concurrency=config.batch_max_concurrency
     )
     
     http_server = providers.Singleton(
@@ -70,15 +103,72 @@ class ApplicationContainer(containers.DeclarativeContainer):
         bucket=config.s3_bucket
     )
     
-    portfolio = providers.Singleton(services.Portfolio)
+    tick_recorder = providers.Singleton(
+        services.TickRecorder,
+        enabled=config.tick_recorder_enabled,
+        directory=config.tick_recorder_directory,
+        segment_bytes=config.tick_recorder_segment_bytes,
+        segment_interval=config.tick_recorder_segment_interval,
+        max_pending_bytes=config.tick_recorder_max_pending_bytes,
+        upload=config.tick_recorder_upload,
+        upload_prefix=config.tick_recorder_upload_prefix
+    )
+    
+    model_cache = providers.Singleton(
+        services.ModelCache,
+        cache_dir=config.model_cache_dir
+    )
     
-    order_book = providers.Singleton(services.OrderBook)
+    portfolio = providers.Singleton(
+        services.Portfolio,
+        sync_window_ms=config.portfolio_sync_window_ms,
+        drift_tolerance=config.portfolio_drift_tolerance
+    )
+    
+    # Per-product services, built once per product by the shard registry
+    order_book = providers.Factory(
+        services.OrderBook,
+        max_terminal_orders=config.order_book_max_terminal_orders
+    )
     
-    position_book = providers.Singleton(services.PositionBook)
+    position_book = providers.Factory(services.PositionBook)
     
-    data_store = providers.Singleton(
+    data_store = providers.Factory(
         services.DataStore,
-        max_size=config.data_store_size
+        max_size=config.data_store_size,
+        depth=config.data_store_depth
+    )
+    
+    local_book = providers.Factory(
+        services.LocalBook,
+        mid_price_tolerance=config.local_book_mid_price_tolerance
+    )
+    
+    agent = providers.Factory(agents.RandomAgent)
+    
+    inference = providers.Singleton(
+        services.InferenceService,
+        batch_window_ms=config.inference_batch_window_ms,
+        max_batch_size=config.inference_max_batch_size,
+        mode=config.inference_mode,
+        workers=config.inference_workers
+    )
+    
+    decision_gate = providers.Singleton(
+        services.DecisionGate,
+        policy=config.decision_policy,
+        queue_size=config.decision_queue_size,
+        max_lag_ms=config.decision_max_lag_ms
+    )
+    
+    shards = providers.Singleton(
+        services.ShardRegistry,
+        product_codes=config.crypto_currency_codes,
+        order_book_factory=order_book.provider,
+        position_book_factory=position_book.provider,
+        data_store_factory=data_store.provider,
+        local_book_factory=local_book.provider,
+        agent_factory=agent.provider
     )
     
     handler_dispatcher = providers.Singleton(
@@ -88,27 +178,46 @@ class ApplicationContainer(containers.DeclarativeContainer):
             providers.Factory(message_handlers.ChildOrderEventHandler)
         )
     )
-    
-    agent = providers.Singleton(agents.RandomAgent)
 
 
 async def bot(container: ApplicationContainer) -> None:
     """
     Main entry point for the bot application.
-    This function initializes the application container, synchronizes the portfolio,
+    This function fetches the model, synchronizes the portfolio, warms up the models,
     and starts the stream.
     :param container: The application container that holds all services and configurations.
     """
-    await asyncio.gather(
-        container.portfolio().sync(),
-        container.order_book().sync(),
-        container.position_book().sync()
-    )
-    await asyncio.gather(
-        container.batch().run(),
-        container.stream().run(),
-        container.http_server().run()
-    )
+    # Startup is inside the try, so the records logged before a failure, and the failure itself, are written before exiting.
+    try:
+        if container.config.model_key():
+            model_path = await container.model_cache().fetch(container.config.model_key())
+            container.config.model_path.from_value(model_path)
+        await asyncio.gather(
+            container.portfolio().sync(),
+            container.shards().sync()
+        )
+        # Load and warm up each model before the stream starts, so the first decision does not pay for it.
+        warmed_up = set()
+        for shard in container.shards():
+            if shard.agent.batch_key not in warmed_up:
+                warmed_up.add(shard.agent.batch_key)
+                await container.inference().warm_up(shard.agent, shard.data_store.shape, shard.data_store.dtype)
+        container.tick_recorder().start()
+        await asyncio.gather(
+            container.watchdog().run(),
+            container.batch().run(),
+            container.stream().run(),
+            container.http_server().run()
+        )
+    except Exception as e:
+        container.logger().system.critical(f"The bot stopped on an error: {e!r}", exc_info=True)
+        raise
+    finally:
+        await container.http_server().close()
+        await container.exchange_client().close()
+        container.inference().close()
+        container.tick_recorder().close()
+        container.logger().close()
 
 
 def main() -> None:
@@ -116,18 +225,55 @@ def main() -> None:
     
     container = ApplicationContainer()
     
+    container.config.log_queue_size.from_env('LOG_QUEUE_SIZE', 10000)
+    container.config.log_max_bytes.from_env('LOG_MAX_BYTES', 0)
+    container.config.log_backup_count.from_env('LOG_BACKUP_COUNT', 5)
+    container.config.log_rotate_interval.from_env('LOG_ROTATE_INTERVAL', 0)
+    container.config.log_json_lines.from_env('LOG_JSON_LINES', False)
     container.config.s3_bucket.from_env('S3_BUCKET')
     container.config.legal_currency_code.from_env('LEGAL_CURRENCY_CODE')
-    container.config.crypto_currency_code.from_env('CRYPTO_CURRENCY_CODE')
+    # CRYPTO_CURRENCY_CODES is a comma separated list of the products to trade; CRYPTO_CURRENCY_CODE is kept for a single product.
+    crypto_currency_codes = os.environ.get('CRYPTO_CURRENCY_CODES') or os.environ.get('CRYPTO_CURRENCY_CODE', '')
+    container.config.crypto_currency_codes.from_value([code.strip() for code in crypto_currency_codes.split(',') if code.strip()])
     container.config.data_store_size.from_env('DATA_STORE_SIZE')
+    container.config.data_store_depth.from_env('DATA_STORE_DEPTH', 10)
+    container.config.local_book_mid_price_tolerance.from_env('LOCAL_BOOK_MID_PRICE_TOLERANCE', 1e-7)
+    container.config.portfolio_sync_window_ms.from_env('PORTFOLIO_SYNC_WINDOW_MS', 50)
+    container.config.portfolio_drift_tolerance.from_env('PORTFOLIO_DRIFT_TOLERANCE', 1e-4)
+    container.config.order_book_max_terminal_orders.from_env('ORDER_BOOK_MAX_TERMINAL_ORDERS', 10000)
+    container.config.batch_max_concurrency.from_env('BATCH_MAX_CONCURRENCY', 4)
+    container.config.inference_batch_window_ms.from_env('INFERENCE_BATCH_WINDOW_MS', 2.0)
+    container.config.inference_max_batch_size.from_env('INFERENCE_MAX_BATCH_SIZE', 16)
+    container.config.inference_mode.from_env('INFERENCE_MODE', 'thread')
+    container.config.inference_workers.from_env('INFERENCE_WORKERS', 1)
+    container.config.decision_policy.from_env('DECISION_POLICY', 'latest')
+    container.config.decision_queue_size.from_env('DECISION_QUEUE_SIZE', 1)
+    container.config.decision_max_lag_ms.from_env('DECISION_MAX_LAG_MS', 1000.0)
     container.config.bitflyer_websocket_url.from_env('BITFLYER_WEBSOCKET_URL')
+    container.config.stream_decoder.from_env('STREAM_DECODER', 'auto')
+    container.config.stream_queue_size.from_env('STREAM_QUEUE_SIZE', 10000)
+    container.config.tick_recorder_enabled.from_env('TICK_RECORDER_ENABLED', False)
+    container.config.tick_recorder_directory.from_env('TICK_RECORDER_DIRECTORY', 'ticks')
+    container.config.tick_recorder_segment_bytes.from_env('TICK_RECORDER_SEGMENT_BYTES', 256 * 1024 * 1024)
+    container.config.tick_recorder_segment_interval.from_env('TICK_RECORDER_SEGMENT_INTERVAL', 3600)
+    container.config.tick_recorder_max_pending_bytes.from_env('TICK_RECORDER_MAX_PENDING_BYTES', 64 * 1024 * 1024)
+    container.config.tick_recorder_upload.from_env('TICK_RECORDER_UPLOAD', False)
+    container.config.tick_recorder_upload_prefix.from_env('TICK_RECORDER_UPLOAD_PREFIX', 'ticks/')
     container.config.bitflyer_api_base_url.from_env('BITFLYER_API_BASE_URL')
     container.config.bitflyer_api_key.from_env('BITFLYER_API_KEY')
     container.config.bitflyer_api_secret.from_env('BITFLYER_API_SECRET')
+    container.config.bitflyer_api_timeout.from_env('BITFLYER_API_TIMEOUT', 10.0)
+    container.config.bitflyer_api_max_concurrency.from_env('BITFLYER_API_MAX_CONCURRENCY', 10)
     container.config.line_messaging_api_base_url.from_env('LINE_MESSAGING_API_BASE_URL')
     container.config.line_messaging_api_channel_token.from_env('LINE_MESSAGING_API_CHANNEL_TOKEN')
     container.config.line_messaging_api_destination_user_id.from_env('LINE_MESSAGING_API_DESTINATION_USER_ID')
     container.config.model_path.from_env('MODEL_PATH')
+    # MODEL_KEY is the key of the model in S3_BUCKET; when set, the model is fetched into MODEL_CACHE_DIR and MODEL_PATH is ignored.
+    container.config.model_key.from_env('MODEL_KEY')
+    container.config.model_cache_dir.from_env('MODEL_CACHE_DIR', 'models')
+    container.config.watchdog_interval_ms.from_env('WATCHDOG_INTERVAL_MS', 50.0)
+    container.config.watchdog_threshold_ms.from_env('WATCHDOG_THRESHOLD_MS', 100.0)
+    container.config.event_bus_max_size.from_env('EVENT_BUS_MAX_SIZE', 1000)
     container.config.http.host.from_env('HTTP_HOST', '0.0.0.0')
     container.config.http.port.from_env('HTTP_PORT', 8080)
     container.config.http.debug.from_env('HTTP_DEBUG', False)
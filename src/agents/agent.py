@@ -1,4 +1,8 @@
+from typing import Any, Callable, Dict, Hashable, List
 from abc import ABC, abstractmethod
+import copy
+
+import numpy as np
 
 from dependency_injector.wiring import Provide, inject
 
@@ -10,16 +14,84 @@ class Agent(ABC):
     Abstract base class for agents.
     Agents are responsible for executing tasks and managing their own state.
     """
+    _models: Dict[Hashable, Any] = {}
     
     @abstractmethod
-    async def get_action(self, observations: list) -> int:
+    def predict(self, observations: np.ndarray) -> List[int]:
         """
-        Get the action to be taken based on the current state.
-        :param observations: The current observations/data.
-        :return: The action to be taken.
+        Get the actions for a batch of observations in a single forward pass.
+        This may run in an inference thread, so it must not touch the event loop.
+        Agents sharing a `batch_key` must share the same model, since a batch of their observations is run by one of them.
+        :param observations: The batch of observation windows, of shape (batch, window, depth, 4).
+            It may be a view into a shared batch buffer and must be copied if kept beyond this call.
+        :return: One action per observation.
         """
         pass
     
+    @classmethod
+    def load_predictor(cls, model_path: str) -> Callable[[np.ndarray], List[int]]:
+        """
+        Build a standalone batched predict function from a model path.
+        This is used by inference worker processes, which load their own copy of the model instead of receiving the agent.
+        Agents that do not override it cannot run with the `process` inference mode, which is checked on warm-up.
+        :param model_path: The path of the model.
+        :return: A function with the same contract as `predict`.
+        """
+        raise NotImplementedError(f"{cls.__name__} does not support inference in worker processes.")
+    
+    @classmethod
+    def supports_worker_processes(cls) -> bool:
+        """
+        Whether the agent implements `load_predictor` and can therefore run in inference worker processes.
+        """
+        return cls.load_predictor.__func__ is not Agent.load_predictor.__func__
+    
+    @classmethod
+    def load_model(cls, model_path: str) -> Any:
+        """
+        Load the model at a path.
+        The weights are memory-mapped instead of read, so loading is fast and the pages are shared with
+        other processes that load the same file.
+        :param model_path: The path of the model.
+        """
+        # Imported here so that agents without a torch model do not pay for importing it.
+        import torch
+        return torch.load(model_path, map_location='cpu', mmap=True, weights_only=False)
+    
+    @property
+    def model(self) -> Any:
+        """
+        The model of the agent, loaded on first use and shared by the agents with the same `batch_key`.
+        """
+        key = self.batch_key
+        if key not in Agent._models:
+            Agent._models[key] = self.load_model(self.model_path)
+        return Agent._models[key]
+    
+    @classmethod
+    def release_model(cls, model_path: str) -> None:
+        """
+        Drop the loaded model at a path, so that it is freed once no batch uses it anymore.
+        :param model_path: The path of the model.
+        """
+        Agent._models.pop((cls, model_path), None)
+    
+    def with_model_path(self, model_path: str) -> 'Agent':
+        """
+        Get a copy of the agent that uses the model at another path, for trying out a model without affecting trading.
+        :param model_path: The path of the model.
+        """
+        agent = copy.copy(self)
+        agent.model_path = model_path
+        return agent
+    
+    @property
+    def batch_key(self) -> Hashable:
+        """
+        The key of the agents whose observations may be batched together.
+        """
+        return (self.__class__, self.model_path)
+    
     @abstractmethod
     async def action(self, action: int) -> None:
         """
@@ -30,8 +102,12 @@ class Agent(ABC):
     
     @inject
     def __init__(self,
+                 product_code: str,
                  logger: Logger = Provide['logger'],
                  config: dict = Provide['config']):
+        """
+        :param product_code: The product this agent trades.
+        """
         self.logger = logger
-        self.crypto_currency_code = config.get('crypto_currency_code')
+        self.product_code = product_code
         self.model_path = config.get('model_path')
\ No newline at end of file
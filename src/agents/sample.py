@@ -1,6 +1,9 @@
+from typing import Callable, List
 from enum import Enum
 import random
 
+import numpy as np
+
 from .agent import Agent
 
 
@@ -11,8 +14,16 @@ class Action(Enum):
 
 
 class RandomAgent(Agent):
-    async def get_action(self, states: list) -> Action:
-        return random.choice(list(Action))
+    def predict(self, observations: np.ndarray) -> List[Action]:
+        return [random.choice(list(Action)) for _ in range(len(observations))]
+    
+    @classmethod
+    def load_model(cls, model_path: str) -> None:
+        return None
+    
+    @classmethod
+    def load_predictor(cls, model_path: str) -> Callable[[np.ndarray], List[Action]]:
+        return lambda observations: [random.choice(list(Action)) for _ in range(len(observations))]
     
     async def action(self, action: Action) -> None:
         match action:
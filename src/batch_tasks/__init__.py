@@ -1,10 +1,14 @@
 from .batch_task import BatchTask
 from .health_check import HealthCheckTask
 from .notification import NotificationTask
+from .reconciliation import ReconciliationTask
+from .model_update import ModelUpdateTask
 
 
 __all__ = [
     'BatchTask',
     'HealthCheckTask',
     'NotificationTask',
+    'ReconciliationTask',
+    'ModelUpdateTask',
 ]
\ No newline at end of file
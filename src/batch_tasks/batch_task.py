@@ -6,11 +6,14 @@ from services.logger import Logger
 
 
 class BatchTask(ABC):
+    jitter: float = 0.0  # Random delay in seconds added to each run, to spread out tasks sharing an interval
+    
     @property
     @abstractmethod
-    def interval(self) -> int:
+    def interval(self) -> float:
         """
         Get the interval in seconds at which to run the task.
+        Sub-second intervals are allowed.
         :return: The interval in seconds.
         """
         return 600  # Default to 10 minutes
@@ -22,10 +25,17 @@ class BatchTask(ABC):
         """
         pass
     
+    async def setup(self):
+        """
+        Prepare the batch task before its first run.
+        Override this method for initialization that needs to await I/O.
+        """
+        pass
+    
     @inject
     def __init__(self,
                  logger: Logger = Provide['logger'],
                  config: dict = Provide['config']):
         self.logger = logger
         self.legal_currency_code = config.get('legal_currency_code')
-        self.crypto_currency_code = config.get('crypto_currency_code')
\ No newline at end of file
+        self.crypto_currency_codes = config.get('crypto_currency_codes')
\ No newline at end of file
@@ -1,9 +1,11 @@
 from enum import Enum
+import asyncio
 
 from dependency_injector.wiring import Provide, inject
 
 from services.exchange_client import ExchangeClient
 from services.stream import Stream
+from services.shard_registry import ShardRegistry
 from .batch_task import BatchTask
 
 
@@ -30,24 +32,25 @@ class HealthCheckTask(BatchTask):
     @inject
     async def __call__(self,
                        exchange_client: ExchangeClient = Provide['exchange_client'],
-                       stream: Stream = Provide['stream']):
+                       stream: Stream = Provide['stream'],
+                       shards: ShardRegistry = Provide['shards']):
         """
-        Perform a health check.
-        This method can be extended to include actual health check logic.
+        Perform a health check of every traded product.
+        Decisions are halted for the products that are not healthy, and the stream is paused only while no product is.
         """
         self.logger.system.info("Performing health check...")
         
-        boardstate = exchange_client.get_health(self.crypto_currency_code)
-        health = boardstate.get('health', Health.NORMAL.value)
-        state = boardstate.get('state', State.RUNNING.value)
+        boardstates = await asyncio.gather(*[exchange_client.get_health(shard.product_code) for shard in shards])
+        for shard, boardstate in zip(shards, boardstates):
+            health = boardstate.get('health', Health.NORMAL.value)
+            state = boardstate.get('state', State.RUNNING.value)
+            halted = health != Health.NORMAL.value or state != State.RUNNING.value
+            if halted != shard.halted:
+                self.logger.system.info(f"Trading of {shard.product_code} is {'halted' if halted else 'restarted'} (health: {health}, state: {state}).")
+            shard.halted = halted
         
-        if stream.paused and health == Health.NORMAL.value and state == State.RUNNING.value:
+        healthy = not all(shard.halted for shard in shards)
+        if stream.paused and healthy:
             stream.resume()
-        elif not stream.paused and (health != Health.NORMAL.value or state != State.RUNNING.value):
-            stream.pause()
-    
-    @inject
-    def __init__(self,
-                 config: dict = Provide['config']):
-        super().__init__()
-        self.crypto_currency_code = config.get('crypto_currency_code')
\ No newline at end of file
+        elif not stream.paused and not healthy:
+            stream.pause()
\ No newline at end of file
@@ -0,0 +1,84 @@
+from collections import defaultdict
+import asyncio
+
+import numpy as np
+from dependency_injector.wiring import inject, Provide
+
+from services.model_cache import ModelCache
+from services.inference import InferenceService
+from services.shard_registry import ShardRegistry
+from .batch_task import BatchTask
+
+
+class ModelUpdateTask(BatchTask):
+    interval: int = 60  # 1 minute
+    
+    model_key: str = None
+    _etag: str = None
+    
+    @inject
+    async def setup(self,
+                    model_cache: ModelCache = Provide['model_cache'],
+                    config: dict = Provide['config']):
+        """
+        Record the version of the model the bot started with, which may be an older cached version when S3 was unreachable.
+        """
+        self.model_key = config.get('model_key')
+        model_path = config.get('model_path')
+        if self.model_key and model_path:
+            self._etag = model_cache.get_path_etag(model_path)
+    
+    @inject
+    async def __call__(self,
+                       model_cache: ModelCache = Provide['model_cache'],
+                       inference: InferenceService = Provide['inference'],
+                       shards: ShardRegistry = Provide['shards']):
+        """
+        Swap in a new version of the model without stopping the stream.
+        The new version is downloaded and loaded in the background, validated on the current data store windows
+        and warmed up. The agents are then switched to it in one step of the event loop, so no decision is made with
+        a half swapped model, and the old model is released. At most two models are loaded at any time.
+        A version that fails validation is not tried again.
+        """
+        if not self.model_key:
+            return
+        etag = await model_cache.get_etag(self.model_key)
+        if etag == self._etag:
+            return
+        self.logger.system.info(f"Updating model {self.model_key} to {etag}...")
+        model_path = await model_cache.fetch(self.model_key, etag)
+        
+        groups = defaultdict(list)
+        for shard in shards:
+            if shard.agent.model_path != model_path:
+                groups[shard.agent.batch_key].append(shard)
+        
+        swaps = []
+        try:
+            for group in groups.values():
+                probe = group[0].agent.with_model_path(model_path)
+                swaps.append((group, probe))
+                await asyncio.to_thread(lambda: probe.model)
+                windows = [shard.data_store.get_data() for shard in group if len(shard.data_store) == shard.data_store.max_size]
+                if windows:
+                    # Stacking copies the windows, which may change while the model runs.
+                    observations = np.stack(windows)
+                    actions = await asyncio.to_thread(probe.predict, observations)
+                    if len(actions) != len(observations):
+                        raise ValueError(f"{len(actions)} actions for {len(observations)} observations")
+                await inference.warm_up(probe, group[0].data_store.shape, group[0].data_store.dtype)
+        except Exception as e:
+            for _, probe in swaps:
+                type(probe).release_model(model_path)
+            self._etag = model_cache.get_path_etag(model_path)
+            self.logger.system.error(f"Rejected model {self.model_key} ({etag}): {e}")
+            return
+        
+        # No awaits from here on, so every agent switches between two decisions.
+        for group, probe in swaps:
+            old_model_path = group[0].agent.model_path
+            for shard in group:
+                shard.agent.model_path = model_path
+            type(probe).release_model(old_model_path)
+        self._etag = model_cache.get_path_etag(model_path)
+        self.logger.system.info(f"Updated model {self.model_key} to {etag}")
\ No newline at end of file
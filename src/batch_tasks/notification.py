@@ -1,10 +1,11 @@
 import datetime
+import asyncio
 
 from dependency_injector.wiring import inject, Provide
 
 from services.notifier import Notifier
 from services.exchange_client import ExchangeClient
-from services.order_book import OrderBook
+from services.shard_registry import ShardRegistry
 from .batch_task import BatchTask
 
 
@@ -17,7 +18,7 @@ class NotificationTask(BatchTask):
     async def __call__(self,
                        notifier: Notifier = Provide['notifier'],
                        exchange_client: ExchangeClient = Provide['exchange_client'],
-                       order_book: OrderBook = Provide['order_book']):
+                       shards: ShardRegistry = Provide['shards']):
         """
         Send a notification.
         This method can be extended to include actual notification logic.
@@ -28,27 +29,31 @@ class NotificationTask(BatchTask):
         now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         message = f"Report Order History (~{now})\n\n"
         
-        collateral_history = exchange_client.get_collateral_history(after=self.last_collateral_history_id)
+        collateral_history = await exchange_client.get_collateral_history(after=self.last_collateral_history_id)
         legal_currency_pnl = sum([entry['change'] for entry in collateral_history if entry['currency_code'] == self.legal_currency_code])
         self.last_collateral_history_id = collateral_history[0]['id'] if collateral_history else self.last_collateral_history_id
         
-        orders = await order_book.get_orders()
-        await order_book.flush()
+        orders = []
+        for shard in shards:
+            orders += await shard.order_book.get_orders()
+            await shard.order_book.flush()
         
         message += f"PnL: {legal_currency_pnl} {self.legal_currency_code}\n\n"
         
         for order in orders:
-            message += f"- ID: {order.child_order_acceptance_id}, State: {order.child_order_state}, Side: {order.side}, Price: {order.price}, Size: {order.size}\n"
+            message += f"- ID: {order.child_order_acceptance_id}, Product: {order.product_code}, State: {order.child_order_state}, Side: {order.side}, Price: {order.price}, Size: {order.size}\n"
         if not orders:
             message += "No new orders."
         
-        notifier.notify(message)
+        # The notifier makes a blocking request, so it runs in a thread to keep the event loop free.
+        await asyncio.to_thread(notifier.notify, message)
     
     @inject
-    def __init__(self,
-                 exchange_client: ExchangeClient = Provide['exchange_client']):
-        super().__init__()
-        
-        collateral_history = exchange_client.get_collateral_history(count=1)
+    async def setup(self,
+                    exchange_client: ExchangeClient = Provide['exchange_client']):
+        """
+        Remember the latest collateral history entry so that the first report only covers new entries.
+        """
+        collateral_history = await exchange_client.get_collateral_history(count=1)
         if collateral_history:
             self.last_collateral_history_id = collateral_history[0]['id']
\ No newline at end of file
@@ -0,0 +1,19 @@
+from dependency_injector.wiring import inject, Provide
+
+from services.portfolio import Portfolio
+from .batch_task import BatchTask
+
+
+class ReconciliationTask(BatchTask):
+    interval: int = 300  # 5 minutes
+    
+    @inject
+    async def __call__(self,
+                       portfolio: Portfolio = Provide['portfolio']):
+        """
+        Reconcile the local portfolio ledger against the exchange.
+        Drift between the two is reported by the portfolio itself.
+        """
+        self.logger.system.info("Reconciling portfolio...")
+        
+        await portfolio.sync()
\ No newline at end of file
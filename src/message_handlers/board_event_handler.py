@@ -1,39 +1,110 @@
+from typing import Dict, List, TYPE_CHECKING
+
 from dependency_injector.wiring import inject, Provide
 
-from services.data_store import DataStore
-from agents import Agent
+from services.shard_registry import Shard, ShardRegistry
+from services.decision_gate import DecisionGate
+from services.latency import message_context
 from .message_handler import MessageHandler
 
+if TYPE_CHECKING:
+    # Imported for type checking only, since the stream depends on the handlers through the dispatcher.
+    from services.stream import Stream
+
 
 class BoardEventHandler(MessageHandler):
     """
-    Handles board events for a specific cryptocurrency.
-    This handler processes messages related to the lightning board snapshot for the specified cryptocurrency.
+    Handles board events for every traded cryptocurrency.
+    This handler maintains the local book of each product from its lightning board diffs,
+    and loads a lightning board snapshot whenever a local book has to be resynchronized.
     """
-    channel_names = []
+    channel_names: List[str] = None
     
     @inject
     async def handle_message(self,
                              data: list|dict,
                              channel: str,
-                             agent: Agent = Provide['agent'],
-                             data_store: DataStore = Provide['data_store']) -> None:
+                             shards: ShardRegistry = Provide['shards'],
+                             decision_gate: DecisionGate = Provide['decision_gate']) -> None:
         """
-        Handles the incoming message by checking the channel and appending data to the buffer if it matches.
+        Handles the incoming message by updating the local book of its product and appending its best levels to the buffer.
         :param data: The data received from the WebSocket message.
         :param channel: The channel from which the message was received.
-        :param data_store: The data store service to append data to.
-        :param portfolio: The portfolio service (not used in this handler but can be extended).
+        :param shards: The per-product services, of which the product of the channel is used.
+        :param decision_gate: The service that runs the decisions of the agents in the background.
         """
-        data_store.append(data)
+        product_code = self._product_codes[channel]
+        shard = shards[product_code]
+        local_book = shard.local_book
+        data_store = shard.data_store
+        
+        if channel == self.snapshot_channel_names[product_code]:
+            local_book.load_snapshot(data)
+            await self._unsubscribe_snapshot(product_code)
+        elif not local_book.apply(data):
+            self.logger.system.warning(f"The local book of {product_code} is out of sync, resynchronizing from a snapshot.")
+            await self._resync(shard)
+            return
+        
+        context = message_context.get()
+        if context is not None:
+            context.stamp('book')
+        
+        if not local_book.ready:
+            return
         
-        if (len(data_store) == data_store.max_size):
-            action = await agent.get_action(data_store.get_data())
-            await agent.action(action)
+        data_store.append_levels(*local_book.levels(data_store.depth))
+        if context is not None:
+            context.stamp('append')
+        
+        if (len(data_store) == data_store.max_size) and not shard.halted:
+            decision_gate.submit(shard)
+    
+    @inject
+    async def reset(self,
+                    shards: ShardRegistry = Provide['shards']) -> None:
+        """
+        Invalidates every local book and subscribes to the board snapshots to rebuild them.
+        """
+        for shard in shards:
+            await self._resync(shard)
+    
+    @inject
+    async def overflow(self,
+                       channel: str,
+                       shards: ShardRegistry = Provide['shards']) -> None:
+        """
+        Invalidates the local book of the product whose diffs were dropped and subscribes to its board snapshot to rebuild it.
+        """
+        shard = shards[self._product_codes[channel]]
+        self.logger.system.warning(f"The board queue of {shard.product_code} overflowed, resynchronizing from a snapshot.")
+        await self._resync(shard)
+    
+    @inject
+    async def _resync(self,
+                      shard: Shard,
+                      stream: 'Stream' = Provide['stream']) -> None:
+        """
+        Invalidates the local book of a product and subscribes to its board snapshot to rebuild it.
+        """
+        shard.local_book.invalidate()
+        await stream.subscribe(self.snapshot_channel_names[shard.product_code])
+    
+    @inject
+    async def _unsubscribe_snapshot(self,
+                                    product_code: str,
+                                    stream: 'Stream' = Provide['stream']) -> None:
+        await stream.unsubscribe(self.snapshot_channel_names[product_code])
     
     def __init__(self):
         """
-        Initializes the BoardEventHandler with the cryptocurrency code.
+        Initializes the BoardEventHandler with the cryptocurrency codes.
         """
         super().__init__()
-        self.channel_names.append(f'lightning_board_snapshot_{self.crypto_currency_code}')
\ No newline at end of file
+        self.snapshot_channel_names: Dict[str, str] = {code: f'lightning_board_snapshot_{code}' for code in self.crypto_currency_codes}
+        self.diff_channel_names: Dict[str, str] = {code: f'lightning_board_{code}' for code in self.crypto_currency_codes}
+        self._product_codes = {
+            **{channel: code for code, channel in self.snapshot_channel_names.items()},
+            **{channel: code for code, channel in self.diff_channel_names.items()},
+        }
+        self.channel_names = list(self._product_codes)
\ No newline at end of file
@@ -3,9 +3,11 @@ import asyncio
 from dependency_injector.wiring import inject, Provide
 
 from services.portfolio import Portfolio
-from services.order_book import Order, OrderBook
-from services.position_book import Position, PositionBook
+from services.order_book import Order
+from services.position_book import Position
+from services.shard_registry import ShardRegistry
 from services.exchange_client import TransactionException
+from services.event_bus import EventBus
 from .message_handler import MessageHandler
 
 
@@ -20,20 +22,34 @@ class ChildOrderEventHandler(MessageHandler):
     async def handle_message(self,
                              data: list,
                              channel: str,
-                             order_book: OrderBook = Provide['order_book'],
-                             position_book: PositionBook = Provide['position_book'],
-                             portfolio: Portfolio = Provide['portfolio']) -> None:
+                             shards: ShardRegistry = Provide['shards'],
+                             portfolio: Portfolio = Provide['portfolio'],
+                             event_bus: EventBus = Provide['event_bus']) -> None:
         """
         Handles the incoming message by checking the channel and processing child order data.
+        Events are routed to the order and position books of their product, and events of untraded products are ignored.
+        Events without a product are logged as errors and skipped.
         :param data: The data received from the WebSocket message.
         :param channel: The channel from which the message was received.
-        :param portfolio: The portfolio service to synchronize the portfolio.
+        :param shards: The per-product services.
+        :param portfolio: The portfolio service whose local ledger is updated by executions.
+        :param event_bus: The bus the fills are published to.
         """
         for d in data:
+            product_code = d['product_code'] if 'product_code' in d else None
+            if not product_code:
+                # Malformed events are reported but do not stop the other events of the message.
+                self.logger.system.error(f"Child order event without product_code ignored: {d}")
+                continue
+            shard = shards.get(product_code)
+            if shard is None:
+                continue
+            order_book = shard.order_book
+            position_book = shard.position_book
+            
             if 'event_type' in d and d['event_type'] == 'ORDER':
                 """Handles order events for child orders.
                 This method processes order events and updates the portfolio accordingly."""
-                product_code = d['product_code'] if 'product_code' in d else None
                 child_order_id = d['child_order_id'] if 'child_order_id' in d else None
                 child_order_acceptance_id = d['child_order_acceptance_id'] if 'child_order_acceptance_id' in d else None
                 child_order_type = d['child_order_type'] if 'child_order_type' in d else None
@@ -45,19 +61,16 @@ class ChildOrderEventHandler(MessageHandler):
                 if (not product_code or not child_order_id or not child_order_acceptance_id or not child_order_type or not expire_date or not side or not price or not size):
                     raise TransactionException('Invalid order event data received. Missing required fields: product_code, child_order_id, child_order_acceptance_id, child_order_type, expire_date, side, price, or size.')
                 
-                _ = await asyncio.gather(
-                    order_book.add(Order(
-                        product_code=product_code,
-                        side=side,
-                        child_order_type=child_order_type,
-                        price=price,
-                        size=size,
-                        child_order_acceptance_id=child_order_acceptance_id,
-                        child_order_id=child_order_id,
-                        expire_date=expire_date
-                    )),
-                    portfolio.sync()
-                )
+                await order_book.add(Order(
+                    product_code=product_code,
+                    side=side,
+                    child_order_type=child_order_type,
+                    price=price,
+                    size=size,
+                    child_order_acceptance_id=child_order_acceptance_id,
+                    child_order_id=child_order_id,
+                    expire_date=expire_date
+                ))
                 
                 self.logger.transaction.info(f'Order event received, Order ID: {child_order_acceptance_id}, Side: {side}, Price: {price}, Size: {size}')
             
@@ -68,22 +81,34 @@ class ChildOrderEventHandler(MessageHandler):
                 side = d['side'] if 'side' in d else None
                 price = d['price'] if 'price' in d else None
                 size = d['size'] if 'size' in d else None
+                commission = d['commission'] if 'commission' in d else 0.0
+                outstanding_size = d['outstanding_size'] if 'outstanding_size' in d else None
                 
                 if child_order_acceptance_id is None or side is None or price is None or size is None:
                     raise TransactionException('Invalid execution event data received. Missing required field: child_order_acceptance_id.')
                 
-                completed, pnl, _ = await asyncio.gather(
-                    order_book.complete(child_order_acceptance_id),
+                order, pnl = await asyncio.gather(
+                    order_book.execute(child_order_acceptance_id, price=price, size=size, commission=commission, outstanding_size=outstanding_size),
                     position_book.add_and_settle(Position(
-                        product_code=self.crypto_currency_code,
+                        product_code=product_code,
                         side=side,
                         price=price,
                         size=size
-                    )),
-                    portfolio.sync()
+                    ))
                 )
+                await portfolio.apply_execution(product_code=product_code, side=side, price=price, size=size, commission=commission, pnl=pnl)
                 
-                self.logger.transaction.info(f'Execution event received, Order ID: {child_order_acceptance_id}, PnL: {pnl}')
+                executed_size = order.executed_size if order else None
+                event_bus.publish('fill', {
+                    'product_code': product_code,
+                    'child_order_acceptance_id': child_order_acceptance_id,
+                    'side': side,
+                    'price': price,
+                    'size': size,
+                    'commission': commission,
+                    'pnl': pnl,
+                })
+                self.logger.transaction.info(f'Execution event received, Order ID: {child_order_acceptance_id}, Executed Size: {executed_size}, PnL: {pnl}')
             
             elif 'event_type' in d and d['event_type'] == 'CANCEL':
                 """Handles cancel events for child orders.
@@ -13,7 +13,7 @@ class MessageHandler(ABC):
     Each handler must implement the `handle_message` method to process the data received.
     """
     legal_currency_code: str = None
-    crypto_currency_code: str = None
+    crypto_currency_codes: List[str] = None
     
     @property
     @abstractmethod
@@ -29,6 +29,21 @@ class MessageHandler(ABC):
         """
         pass
     
+    async def reset(self) -> None:
+        """
+        Reset any state derived from previous messages.
+        This is called whenever messages may have been missed, e.g. on every WebSocket connection.
+        """
+        pass
+    
+    async def overflow(self, channel: str) -> None:
+        """
+        Recover from messages of a channel that were dropped because its queue was full.
+        By default, the whole state is reset.
+        :param channel: The channel whose messages were dropped.
+        """
+        await self.reset()
+    
     @inject
     def __init__(self,
                  config: dict = Provide['config'],
@@ -37,5 +52,5 @@ class MessageHandler(ABC):
         Initialize the message handler.
         """
         self.legal_currency_code = config.get('legal_currency_code')
-        self.crypto_currency_code = config.get('crypto_currency_code')
+        self.crypto_currency_codes = config.get('crypto_currency_codes')
         self.logger = logger
\ No newline at end of file
@@ -1,31 +1,67 @@
 from .exchange_client import ExchangeClient
+from .latency import Histogram, LatencyRecorder, MessageContext, message_context
+from .metrics import Counter, Gauge, Summary, MetricFamily, MetricsRegistry
+from .decoder import Decoder, Frame
+from .channel_queue import ChannelQueue
 from .stream import Stream
 from .logger import Logger
 from .batch import Batch
 from .s3client import S3Client, S3ClientException
+from .model_cache import ModelCache
+from .tick_recorder import TickRecorder
 from .notifier import Notifier
 from .order_book import Order, OrderBook
-from .position_book import Position, PositionBook
+from .position_book import Lot, Position, PositionBook
 from .portfolio import Portfolio
 from .data_store import DataStore
+from .local_book import LocalBook
+from .shard_registry import Shard, ShardRegistry
+from .inference import InferenceService
+from .decision_gate import DecisionGate, DecisionStats
 from .handler_dispatcher import HandlerDispatcher
+from .event_bus import EventBus, Subscription
+from .watchdog import Watchdog
 from .http_server import HttpServer
 
 
 __all__ = [
     'ExchangeClient',
+    'Histogram',
+    'LatencyRecorder',
+    'MessageContext',
+    'message_context',
+    'Counter',
+    'Gauge',
+    'Summary',
+    'MetricFamily',
+    'MetricsRegistry',
+    'Decoder',
+    'Frame',
+    'ChannelQueue',
     'Stream',
     'Logger',
     'Batch',
     'S3Client',
     'S3ClientException',
+    'ModelCache',
+    'TickRecorder',
     'Notifier',
     'Order',
     'OrderBook',
+    'Lot',
     'Position',
     'PositionBook',
     'Portfolio',
     'DataStore',
+    'LocalBook',
+    'Shard',
+    'ShardRegistry',
+    'InferenceService',
+    'DecisionGate',
+    'DecisionStats',
     'HandlerDispatcher',
+    'EventBus',
+    'Subscription',
+    'Watchdog',
     'HttpServer',
 ]
\ No newline at end of file
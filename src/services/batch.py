@@ -1,42 +1,138 @@
-from typing import List
+from typing import Dict, List, Tuple
 import asyncio
+import dataclasses
+import heapq
+import math
+import random
 
 from dependency_injector.wiring import inject, Provide
 
 from batch_tasks.batch_task import BatchTask
 from .logger import Logger
+from .metrics import MetricsRegistry
+
+
+@dataclasses.dataclass(slots=True)
+class TaskStats:
+    """Run-time and lateness metrics of a batch task, in seconds."""
+    runs: int = 0
+    skipped: int = 0
+    failures: int = 0
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+    last_lateness: float = 0.0
+    max_lateness: float = 0.0
 
 
 class Batch:
-    max_count: int = 86400  # 1 day
-    count: int = 0
+    """
+    A scheduler that runs batch tasks at their intervals.
+    Each task has a monotonic deadline kept in a heap, so tasks fire on time however long their siblings take.
+    Tasks run concurrently up to `max_concurrency`, and a task whose previous run is still going is skipped.
+    """
     tasks: List[BatchTask]
+    _schedule: List[Tuple[float, int, float]]
+    _running: Dict[int, asyncio.Task]
+    _stats: Dict[int, TaskStats]
     
     async def run(self):
         """
         Start the batch service.
-        This method starts the event loop and runs the tasks at the specified interval.
+        This method runs the tasks at their deadlines until it is cancelled.
         """
         self.logger.system.info("The batch service is started.")
-        while True:
-            self.count += 1
-            if self.count > self.max_count:
-                self.count = 1
+        await asyncio.gather(*[task.setup() for task in self.tasks])
+        
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        # Each entry is (time to fire, task index, deadline): the deadline advances by whole intervals and the jitter is
+        # added on top of it, so jitter never accumulates into drift.
+        self._schedule = [(self._jittered(task, now + task.interval), i, now + task.interval) for i, task in enumerate(self.tasks) if task.interval > 0]
+        heapq.heapify(self._schedule)
+        
+        while self._schedule:
+            await self._resumed.wait()
+            fire_at, i, deadline = self._schedule[0]
+            delay = fire_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
             
-            if not self.paused:
-                await asyncio.gather(
-                    *[task() for task in self.tasks if (task.interval != 0) and (self.count % task.interval == 0)],
-                    asyncio.sleep(1)
-                )
-            else:
-                await asyncio.sleep(1)
+            task = self.tasks[i]
+            now = loop.time()
+            # Deadlines missed while paused or overloaded are skipped rather than fired in a burst.
+            missed = math.floor((now - deadline) / task.interval)
+            next_deadline = deadline + (missed + 1) * task.interval
+            heapq.heapreplace(self._schedule, (self._jittered(task, next_deadline), i, next_deadline))
+            self._launch(i, fire_at)
+    
+    def _launch(self, i: int, fire_at: float):
+        """
+        Start a run of a task in the background unless its previous run is still going.
+        """
+        if i in self._running:
+            self._stats[i].skipped += 1
+            self.logger.system.warning(f"Skipping {self.tasks[i].__class__.__name__}, since its previous run has not finished.")
+            return
+        self._running[i] = asyncio.create_task(self._execute(i, fire_at))
+    
+    async def _execute(self, i: int, fire_at: float):
+        task = self.tasks[i]
+        stats = self._stats[i]
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._semaphore:
+                started_at = loop.time()
+                stats.last_lateness = started_at - fire_at
+                stats.max_lateness = max(stats.max_lateness, stats.last_lateness)
+                try:
+                    await task()
+                except Exception as e:
+                    stats.failures += 1
+                    self.logger.system.error(f"The batch task {task.__class__.__name__} failed: {e!r}")
+                finally:
+                    stats.runs += 1
+                    stats.last_duration = loop.time() - started_at
+                    stats.max_duration = max(stats.max_duration, stats.last_duration)
+        finally:
+            del self._running[i]
+    
+    @staticmethod
+    def _jittered(task: BatchTask, deadline: float) -> float:
+        return deadline + random.uniform(0, task.jitter) if task.jitter > 0 else deadline
+    
+    def get_task_metrics(self) -> Dict[str, dict]:
+        """
+        Get the run-time and lateness metrics of every task.
+        :return: A dictionary of metrics keyed by task class name.
+        """
+        return {self.tasks[i].__class__.__name__: dataclasses.asdict(stats) for i, stats in self._stats.items()}
+    
+    def _collect_metrics(self, metrics: MetricsRegistry) -> None:
+        runs = metrics.counter('bot_batch_task_runs_total', 'Runs per batch task.', ('task',))
+        skipped = metrics.counter('bot_batch_task_skipped_total', 'Runs skipped because the previous run was still going, per batch task.', ('task',))
+        failures = metrics.counter('bot_batch_task_failures_total', 'Failed runs per batch task.', ('task',))
+        lateness = metrics.gauge('bot_batch_task_lateness_seconds', 'Delay between the deadline and the start of the last run per batch task.', ('task',))
+        max_lateness = metrics.gauge('bot_batch_task_max_lateness_seconds', 'Longest delay between a deadline and the start of a run per batch task.', ('task',))
+        duration = metrics.gauge('bot_batch_task_duration_seconds', 'Duration of the last run per batch task.', ('task',))
+        for name, stats in self.get_task_metrics().items():
+            runs.labels(name).value = stats['runs']
+            skipped.labels(name).value = stats['skipped']
+            failures.labels(name).value = stats['failures']
+            lateness.labels(name).set(stats['last_lateness'])
+            max_lateness.labels(name).set(stats['max_lateness'])
+            duration.labels(name).set(stats['last_duration'])
+    
+    @property
+    def paused(self) -> bool:
+        return not self._resumed.is_set()
     
     def pause(self):
         """
         Pause all tasks in the batch service.
-        This method pauses all tasks that are currently running in the batch service.
+        Runs that have already started are not interrupted.
         """
-        self.paused = True
+        self._resumed.clear()
         self.logger.system.info("The batch service is paused.")
     
     def resume(self):
@@ -44,18 +140,28 @@ class Batch:
         Resume all tasks in the batch service.
         This method resumes all tasks that have been paused.
         """
-        self.paused = False
+        self._resumed.set()
         self.logger.system.info("The batch service is resumed.")
     
     @inject
     def __init__(self,
                  tasks: List[BatchTask],
-                 logger: Logger = Provide['logger']):
+                 max_concurrency: int = 4,
+                 logger: Logger = Provide['logger'],
+                 metrics: MetricsRegistry = Provide['metrics']):
         """
         Initialize the Batch service with a list of tasks.
-        :param tasks: A list of asynchronous tasks to run at the specified interval.
+        :param tasks: A list of asynchronous tasks to run at their intervals. Tasks with an interval of 0 never run.
+        :param max_concurrency: The maximum number of tasks running at the same time.
         :param logger: The logger service to log messages.
+        :param metrics: The registry of the task metrics.
         """
         self.tasks = tasks
         self.logger = logger
-        self.paused = False
\ No newline at end of file
+        self._semaphore = asyncio.Semaphore(int(max_concurrency))
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._schedule = []
+        self._running = {}
+        self._stats = {i: TaskStats() for i in range(len(tasks))}
+        metrics.add_collector(lambda: self._collect_metrics(metrics))
\ No newline at end of file
@@ -0,0 +1,137 @@
+from typing import Any, Awaitable, Callable, Deque, Optional, Tuple
+from collections import deque
+import asyncio
+import time
+
+from .logger import Logger
+from .latency import MessageContext, message_context
+
+# Marks the point of a queue from which the messages of a channel were dropped on overflow.
+_OVERFLOW = object()
+
+
+class ChannelQueue:
+    """
+    A bounded work queue of channel messages with a dedicated consumer task.
+    Messages of `conflated_channels` follow a "latest wins" policy: such a message supersedes every message still pending,
+    which are dropped. Messages of `blocking_channels` follow a "never drop" policy: when the queue is full, `put` waits for room.
+    Every other message never waits: when the queue is full, the pending messages are dropped and the consumer is told
+    through `overflow` before the next message, so that it can rebuild its state, e.g. from a fresh snapshot.
+    Several channels may share one queue when their relative order matters, e.g. board snapshots and board diffs.
+    """
+    name: str
+    max_size: int
+    _pending: Deque[Tuple[Any, str, float, Optional[MessageContext]]]
+    
+    async def put(self, message: Any, channel: str, context: MessageContext = None) -> None:
+        """
+        Enqueue a message for the consumer.
+        :param message: The decoded message.
+        :param channel: The channel from which the message was received.
+        :param context: The timing of the message, set as the message context while it is consumed.
+        """
+        if channel in self.conflated_channels:
+            self.dropped += len(self._pending)
+            self._pending.clear()
+        elif channel in self.blocking_channels:
+            while len(self._pending) >= self.max_size:
+                self._not_full.clear()
+                await self._not_full.wait()
+        elif len(self._pending) >= self.max_size:
+            self.dropped += sum(1 for pending in self._pending if pending[0] is not _OVERFLOW)
+            self.overflows += 1
+            self._pending.clear()
+            self._pending.append((_OVERFLOW, channel, time.monotonic(), None))
+        self._pending.append((message, channel, time.monotonic(), context))
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._pending))
+        self._not_empty.set()
+    
+    async def run(self) -> None:
+        """
+        Consume messages one at a time, in order.
+        A failing message is logged and does not stop the consumer.
+        """
+        while True:
+            while not self._pending:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+            message, channel, enqueued_at, context = self._pending.popleft()
+            self._not_full.set()
+            if message is _OVERFLOW:
+                try:
+                    if self._overflow is not None:
+                        await self._overflow(channel)
+                except Exception as e:
+                    self.logger.system.error(f"Failed to handle the overflow of {channel}: {e!r}")
+                continue
+            message_context.set(context)
+            if context is not None:
+                context.stamp('queue')
+            
+            self.lag = time.monotonic() - enqueued_at
+            self.max_lag = max(self.max_lag, self.lag)
+            try:
+                await self._consumer(message, channel)
+            except Exception as e:
+                self.logger.system.error(f"Failed to handle a message of {channel}: {e!r}")
+            self.processed += 1
+    
+    def start(self) -> None:
+        """
+        Start the consumer task on the running event loop, unless it is already running.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(), name=f'channel_queue_{self.name}')
+    
+    def get_metrics(self) -> dict:
+        return {
+            'depth': len(self._pending),
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'overflows': self.overflows,
+            'processed': self.processed,
+            'lag_ms': self.lag * 1000,
+            'max_lag_ms': self.max_lag * 1000,
+        }
+    
+    def __len__(self):
+        return len(self._pending)
+    
+    def __init__(self,
+                 name: str,
+                 consumer: Callable[[Any, str], Awaitable[None]],
+                 logger: Logger,
+                 conflated_channels: set = frozenset(),
+                 blocking_channels: set = frozenset(),
+                 overflow: Callable[[str], Awaitable[None]] = None,
+                 max_size: int = 10000):
+        """
+        :param name: The name of the queue, used for metrics.
+        :param consumer: The coroutine function called with each message and its channel.
+        :param logger: The logger service to report failing messages.
+        :param conflated_channels: The channels whose messages supersede every pending message.
+        :param blocking_channels: The channels whose messages are never dropped, for which `put` waits for room.
+        :param overflow: The coroutine function called with the channel whose message overflowed the queue,
+            in order with the messages, after the pending messages were dropped.
+        :param max_size: The maximum number of pending messages.
+        """
+        self.name = name
+        self.max_size = int(max_size)
+        self.conflated_channels = conflated_channels
+        self.blocking_channels = blocking_channels
+        self.logger = logger
+        self._consumer = consumer
+        self._overflow = overflow
+        self._pending = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._task = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.overflows = 0
+        self.processed = 0
+        self.max_depth = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
\ No newline at end of file
@@ -1,32 +1,95 @@
-from collections import deque
+from typing import Iterable, Tuple
+
+import numpy as np
 
 
 class DataStore:
     """
-    A service that provides a buffer to store data with a maximum size.
+    A service that provides a buffer to store featurized board snapshots with a maximum size.
     When the buffer reaches its maximum size, the oldest data is discarded.
+    Each snapshot is stored as a (depth, 4) array of bid price, bid size, ask price and ask size for the top levels.
+    Rows are written twice into a preallocated buffer of twice the window size,
+    so the current window is always a contiguous slice that is returned without copying.
     """
+    BID_PRICE = 0
+    BID_SIZE = 1
+    ASK_PRICE = 2
+    ASK_SIZE = 3
+    
     max_size: int
-    _buffer: deque
+    depth: int
+    _buffer: np.ndarray
+    _position: int
+    _count: int
+    
+    def append(self, data: dict) -> None:
+        """
+        Featurizes a board snapshot and appends it to the buffer. If the buffer exceeds its maximum size, the oldest data is removed.
+        :param data: The board snapshot with `bids` and `asks` lists of price and size dictionaries, best level first.
+        """
+        self.append_levels(
+            ((level['price'], level['size']) for level in data['bids'][:self.depth]),
+            ((level['price'], level['size']) for level in data['asks'][:self.depth])
+        )
     
-    def append(self, data) -> None:
+    def append_levels(self, bids: Iterable[Tuple[float, float]], asks: Iterable[Tuple[float, float]]) -> None:
         """
-        Appends data to the buffer. If the buffer exceeds its maximum size, the oldest data is removed.
-        :param data: The data to be appended to the buffer.
+        Appends the top price levels to the buffer. Levels beyond `depth` are ignored and missing levels are zero-filled.
+        :param bids: The bid levels as (price, size) pairs, best level first.
+        :param asks: The ask levels as (price, size) pairs, best level first.
         """
-        self._buffer.append(data)
+        row = self._buffer[self._position]
+        row.fill(0)
+        for i, (price, size) in zip(range(self.depth), bids):
+            row[i, self.BID_PRICE] = price
+            row[i, self.BID_SIZE] = size
+        for i, (price, size) in zip(range(self.depth), asks):
+            row[i, self.ASK_PRICE] = price
+            row[i, self.ASK_SIZE] = size
+        self._buffer[self._position + self.max_size] = row
+        
+        self._position = (self._position + 1) % self.max_size
+        self._count = min(self._count + 1, self.max_size)
     
-    def get_data(self):
+    def get_data(self) -> np.ndarray:
         """
-        Returns a copy of the current data in the buffer.
-        :return: A list containing the data in the buffer.
+        Returns the current window in chronological order, oldest first.
+        The result is a read-only view into the buffer and is only valid until the next append; copy it to keep it longer.
+        :return: An array of shape (len(self), depth, 4).
         """
-        return list(self._buffer)
+        if self._count < self.max_size:
+            view = self._buffer[:self._count]
+        else:
+            view = self._buffer[self._position:self._position + self.max_size]
+        view = view.view()
+        view.flags.writeable = False
+        return view
+    
+    @property
+    def shape(self) -> tuple:
+        """
+        The shape of a full window.
+        """
+        return (self.max_size, self.depth, 4)
+    
+    @property
+    def dtype(self) -> np.dtype:
+        return self._buffer.dtype
     
     def __len__(self):
-        return len(self._buffer)
+        return self._count
     
     def __init__(self,
-                 max_size: int):
+                 max_size: int,
+                 depth: int = 10,
+                 dtype: str = 'float64'):
+        """
+        :param max_size: The number of snapshots in the window.
+        :param depth: The number of price levels kept per side.
+        :param dtype: The dtype of the buffer.
+        """
         self.max_size = int(max_size)
-        self._buffer = deque(maxlen=self.max_size)
\ No newline at end of file
+        self.depth = int(depth)
+        self._buffer = np.zeros((2 * self.max_size, self.depth, 4), dtype=dtype)
+        self._position = 0
+        self._count = 0
\ No newline at end of file
@@ -0,0 +1,195 @@
+from typing import Deque, Dict, Optional, Tuple
+from collections import deque
+import asyncio
+import dataclasses
+import time
+
+import numpy as np
+from dependency_injector.wiring import inject, Provide
+
+from .exception import LogicException
+from .inference import InferenceService
+from .latency import MessageContext, message_context
+from .logger import Logger
+from .event_bus import EventBus
+from .metrics import MetricsRegistry
+from .shard_registry import Shard
+
+
+@dataclasses.dataclass(slots=True)
+class _DecisionState:
+    task: Optional[asyncio.Task] = None
+    latest: Optional[Tuple[float, Optional[MessageContext]]] = None  # The newest snapshot waiting for a decision, under the `latest` policy
+    queue: Deque[Tuple[np.ndarray, float, Optional[MessageContext]]] = dataclasses.field(default_factory=deque)
+
+
+@dataclasses.dataclass(slots=True)
+class DecisionStats:
+    submitted: int = 0
+    decided: int = 0
+    skipped: int = 0
+    late: int = 0
+    failed: int = 0
+    max_lag_ms: float = 0.0
+    total_lag_ms: float = 0.0
+
+
+class DecisionGate:
+    """
+    Service that runs the decisions of the agents in the background, at most one at a time per product.
+    What happens to a snapshot that arrives while a decision of its product is in flight depends on `policy`:
+    `skip` drops it, `latest` remembers that a newer window exists and decides on the newest window once the
+    in-flight decision finishes, and `queue` keeps a copy of up to `queue_size` windows, dropping the oldest.
+    Dropped and coalesced snapshots are counted as skipped. A decision whose action is ready more than `max_lag_ms`
+    after its snapshot arrived is counted as late and not acted on, so inference latency never piles up into decision lag.
+    """
+    POLICIES = ('skip', 'latest', 'queue')
+    
+    _states: Dict[str, _DecisionState]
+    _stats: Dict[str, DecisionStats]
+    
+    def submit(self, shard: Shard) -> None:
+        """
+        Request a decision on the current window of the data store of a product.
+        :param shard: The product whose agent decides.
+        """
+        received_at = time.monotonic()
+        context = message_context.get()
+        state = self._states.setdefault(shard.product_code, _DecisionState())
+        stats = self._stats.setdefault(shard.product_code, DecisionStats())
+        stats.submitted += 1
+        
+        if state.task is None:
+            state.task = asyncio.create_task(self._run(shard, state, stats, None, received_at, context))
+        elif self.policy == 'skip':
+            stats.skipped += 1
+        elif self.policy == 'latest':
+            if state.latest is not None:
+                stats.skipped += 1
+            state.latest = (received_at, context)
+        else:
+            if len(state.queue) >= self.queue_size:
+                state.queue.popleft()
+                stats.skipped += 1
+            # The data store view is only valid until the next append, so queued windows are copied.
+            state.queue.append((shard.data_store.get_data().copy(), received_at, context))
+    
+    async def _run(self,
+                   shard: Shard,
+                   state: _DecisionState,
+                   stats: DecisionStats,
+                   observations: Optional[np.ndarray],
+                   received_at: float,
+                   context: Optional[MessageContext]) -> None:
+        """
+        Decide on a window, then on the windows that arrived in the meantime as the policy says.
+        :param observations: The window to decide on, or None for the current window of the data store.
+        :param received_at: The monotonic time at which the snapshot of the window arrived.
+        :param context: The timing of the message of the snapshot.
+        """
+        try:
+            while True:
+                message_context.set(context)
+                await self._decide(shard, stats, observations, received_at, context)
+                if state.latest is not None:
+                    observations = None
+                    received_at, context = state.latest
+                    state.latest = None
+                elif state.queue:
+                    observations, received_at, context = state.queue.popleft()
+                else:
+                    break
+        finally:
+            state.task = None
+    
+    async def _decide(self,
+                      shard: Shard,
+                      stats: DecisionStats,
+                      observations: Optional[np.ndarray],
+                      received_at: float,
+                      context: Optional[MessageContext]) -> None:
+        if shard.halted:
+            stats.skipped += 1
+            return
+        try:
+            if observations is None:
+                observations = shard.data_store.get_data()
+            if context is not None:
+                context.stamp('decision_wait')
+            action = await self.inference.infer(shard.agent, observations)
+            if context is not None:
+                context.stamp('inference')
+            if action is None:
+                # Superseded by a newer request of the same agent.
+                stats.skipped += 1
+                return
+            lag_ms = (time.monotonic() - received_at) * 1000
+            stats.max_lag_ms = max(stats.max_lag_ms, lag_ms)
+            stats.total_lag_ms += lag_ms
+            if self.max_lag_ms and lag_ms > self.max_lag_ms:
+                stats.late += 1
+                return
+            await shard.agent.action(action)
+            if context is not None:
+                context.stamp_total('action')
+            stats.decided += 1
+            self.event_bus.publish('decision', {
+                'product_code': shard.product_code,
+                'action': getattr(action, 'name', action),
+                'lag_ms': lag_ms,
+            })
+        except Exception as e:
+            stats.failed += 1
+            self.logger.system.exception(f"Decision of {shard.product_code} failed: {e}")
+    
+    def get_metrics(self) -> Dict[str, dict]:
+        """
+        Get the decision counters of each product.
+        """
+        metrics = {}
+        for product_code, stats in self._stats.items():
+            completed = stats.decided + stats.late
+            metrics[product_code] = {
+                **dataclasses.asdict(stats),
+                'average_lag_ms': stats.total_lag_ms / completed if completed else 0.0,
+                'in_flight': self._states[product_code].task is not None,
+            }
+        return metrics
+    
+    @inject
+    def __init__(self,
+                 policy: str = 'latest',
+                 queue_size: int = 1,
+                 max_lag_ms: float = 1000.0,
+                 inference: InferenceService = Provide['inference'],
+                 logger: Logger = Provide['logger'],
+                 metrics: MetricsRegistry = Provide['metrics'],
+                 event_bus: EventBus = Provide['event_bus']):
+        """
+        :param policy: What to do with snapshots that arrive during a decision, one of `skip`, `latest` or `queue`.
+        :param queue_size: The number of windows kept under the `queue` policy, at least 1.
+        :param max_lag_ms: The lag from snapshot to action beyond which a decision is late. 0 disables the check.
+        :param inference: The inference service that runs the models.
+        :param logger: The logger service.
+        :param metrics: The registry of the decision metrics.
+        :param event_bus: The bus the decisions are published to.
+        """
+        if policy not in self.POLICIES:
+            raise LogicException(f"Unknown decision policy: {policy}")
+        if policy == 'queue' and int(queue_size) < 1:
+            raise ValueError(f"The queue decision policy needs a queue size of at least 1, got {queue_size}")
+        self.policy = policy
+        self.queue_size = int(queue_size)
+        self.max_lag_ms = float(max_lag_ms)
+        self.inference = inference
+        self.logger = logger
+        self.event_bus = event_bus
+        self._states = {}
+        self._stats = {}
+        metrics.add_collector(lambda: self._collect_metrics(metrics))
+    
+    def _collect_metrics(self, metrics: MetricsRegistry) -> None:
+        decisions = metrics.counter('bot_decisions_total', 'Decisions per product and outcome.', ('product_code', 'outcome'))
+        for product_code, stats in list(self._stats.items()):
+            for outcome in ('decided', 'skipped', 'late', 'failed'):
+                decisions.labels(product_code, outcome).value = getattr(stats, outcome)
\ No newline at end of file
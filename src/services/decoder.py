@@ -0,0 +1,144 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, TypedDict
+import json
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .exception import LogicException
+
+
+class Level(TypedDict):
+    price: float
+    size: float
+
+
+class BoardMessage(TypedDict):
+    """The message of the lightning_board and lightning_board_snapshot channels."""
+    mid_price: float
+    bids: List[Level]
+    asks: List[Level]
+
+
+class ChildOrderEvent(TypedDict, total=False):
+    """An event of the child_order_events channel. Which fields are present depends on the event type."""
+    product_code: str
+    child_order_id: str
+    child_order_acceptance_id: str
+    event_date: str
+    event_type: str
+    child_order_type: str
+    expire_date: str
+    exec_id: int
+    side: str
+    price: float
+    size: float
+    commission: float
+    sfd: float
+    outstanding_size: float
+    reason: str
+
+
+CHANNEL_TYPES = {
+    'lightning_board_snapshot_': BoardMessage,
+    'lightning_board_': BoardMessage,
+    'child_order_events': List[ChildOrderEvent],
+}
+
+
+class Frame(NamedTuple):
+    """
+    A decoded WebSocket frame.
+    Channel messages have `channel` and `message` set, while responses to requests have `id` and `result` or `error` set.
+    """
+    channel: Optional[str] = None
+    message: Any = None
+    id: Optional[str] = None
+    result: Any = None
+    error: Optional[dict] = None
+
+
+if msgspec is not None:
+    class _Params(msgspec.Struct):
+        channel: str
+        message: msgspec.Raw
+    
+    class _Envelope(msgspec.Struct):
+        id: Optional[str] = None
+        result: Any = None
+        error: Optional[dict] = None
+        params: Optional[_Params] = None
+
+
+class Decoder:
+    """
+    Decodes WebSocket frames into `Frame`s with a pluggable JSON backend.
+    The `orjson` backend is a faster drop-in for `json`, which is the standard library fallback.
+    The `msgspec` backend decodes the envelope first and then validates the message against the type of its channel,
+    at some cost over `orjson` for large board messages.
+    Backends other than `json` are optional dependencies; `auto` picks the first one installed in `BACKENDS` order.
+    Run benchmarks/decoder_benchmark.py to compare them on recorded frames.
+    """
+    BACKENDS = ('orjson', 'msgspec', 'json')
+    
+    backend: str
+    decode: Callable[[str | bytes], Frame]
+    
+    def _decode_msgspec(self, raw: str | bytes) -> Frame:
+        try:
+            envelope = self._envelope_decoder.decode(raw)
+        except msgspec.ValidationError:
+            # An envelope off the expected shape, e.g. with an integer id, is decoded untyped like the other backends do.
+            return self._decode_loads(raw)
+        params = envelope.params
+        if params is None:
+            return Frame(id=envelope.id, result=envelope.result, error=envelope.error)
+        try:
+            message = self._get_message_decoder(params.channel).decode(params.message)
+        except msgspec.ValidationError:
+            # Fall back to an untyped message rather than dropping a frame whose schema changed.
+            message = self._untyped_decoder.decode(params.message)
+        return Frame(channel=params.channel, message=message)
+    
+    def _decode_loads(self, raw: str | bytes) -> Frame:
+        message = self._loads(raw)
+        params = message.get('params')
+        if params is not None and 'channel' in params and 'message' in params:
+            return Frame(channel=params['channel'], message=params['message'])
+        return Frame(id=message.get('id'), result=message.get('result'), error=message.get('error'))
+    
+    def _get_message_decoder(self, channel: str):
+        decoder = self._message_decoders.get(channel)
+        if decoder is None:
+            message_type = next((message_type for prefix, message_type in CHANNEL_TYPES.items() if channel.startswith(prefix)), Any)
+            decoder = self._message_decoders[channel] = msgspec.json.Decoder(message_type)
+        return decoder
+    
+    def __init__(self,
+                 backend: str = 'auto'):
+        """
+        :param backend: One of `auto`, `msgspec`, `orjson` or `json`.
+        """
+        if backend == 'auto':
+            backend = 'orjson' if orjson is not None else 'msgspec' if msgspec is not None else 'json'
+        if backend not in self.BACKENDS:
+            raise LogicException(f"Unknown decoder backend: {backend}")
+        if (backend == 'msgspec' and msgspec is None) or (backend == 'orjson' and orjson is None):
+            raise LogicException(f"The decoder backend {backend} is not installed.")
+        
+        self.backend = backend
+        if backend == 'msgspec':
+            self._envelope_decoder = msgspec.json.Decoder(_Envelope)
+            self._untyped_decoder = msgspec.json.Decoder()
+            self._loads = self._untyped_decoder.decode
+            self._message_decoders: Dict[str, Any] = {}
+            self.decode = self._decode_msgspec
+        else:
+            self._loads = orjson.loads if backend == 'orjson' else json.loads
+            self.decode = self._decode_loads
\ No newline at end of file
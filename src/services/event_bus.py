@@ -0,0 +1,76 @@
+from typing import Any, Dict, Set
+from collections import deque
+import asyncio
+import time
+
+
+class Subscription:
+    """
+    A bounded buffer of the events published since a subscriber joined.
+    A subscriber that falls behind loses its oldest events, which are counted, instead of slowing down publishers.
+    """
+    def put(self, event: dict) -> None:
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        self._events.append(event)
+        self._ready.set()
+    
+    async def get(self) -> dict:
+        """
+        Wait for the next event.
+        """
+        while not self._events:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._events.popleft()
+    
+    def __init__(self, max_size: int):
+        self._events = deque(maxlen=max_size)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+
+class EventBus:
+    """
+    Service that fans out bot events, such as decisions and fills, to in-process subscribers like the HTTP event feed.
+    Publishing never waits and costs nothing without subscribers, so it can be called from hot paths.
+    """
+    _subscriptions: Set[Subscription]
+    
+    def publish(self, type: str, data: Dict[str, Any]) -> None:
+        """
+        Publish an event to every subscriber.
+        :param type: The type of the event, e.g. `decision` or `fill`.
+        :param data: The payload of the event. It must be JSON serializable and not be modified afterwards.
+        """
+        self.published += 1
+        if not self._subscriptions:
+            return
+        event = {'type': type, 'time': time.time(), 'data': data}
+        for subscription in self._subscriptions:
+            subscription.put(event)
+    
+    def subscribe(self) -> Subscription:
+        """
+        Start receiving the events published from now on. The subscription must be passed to `unsubscribe` when done.
+        """
+        subscription = Subscription(self.max_size)
+        self._subscriptions.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+        self.dropped += subscription.dropped
+    
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+    
+    def __init__(self, max_size: int = 1000):
+        """
+        :param max_size: The number of events buffered per subscriber.
+        """
+        self.max_size = int(max_size)
+        self._subscriptions = set()
+        self.published = 0
+        self.dropped = 0
\ No newline at end of file
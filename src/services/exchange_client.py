@@ -1,13 +1,18 @@
-from typing import Literal
+from typing import Literal, Optional
+import asyncio
 import datetime
 import json
 import hashlib
 import hmac
+import time
 from urllib.parse import urlencode
 
-import requests
+import aiohttp
+from dependency_injector.wiring import inject, Provide
 
 from services.exception import RuntimeException
+from services.latency import message_context
+from services.metrics import MetricsRegistry
 
 
 class TransactionException(RuntimeException):
@@ -18,7 +23,10 @@ class TransactionException(RuntimeException):
 class ExchangeClient:
     exchange_name = "bitflyer Lightning"
     
-    def get_ticker(self, symbol: str) -> dict:
+    _session: Optional[aiohttp.ClientSession]
+    _semaphore: Optional[asyncio.Semaphore]
+    
+    async def get_ticker(self, symbol: str) -> dict:
         """
         Fetches the ticker information for a given symbol.
         :param symbol: The product code for which to fetch the ticker.
@@ -26,10 +34,9 @@ class ExchangeClient:
         """
         path = "/v1/getticker"
         params = {"product_code": symbol}
-        response = requests.get(self.base_url + path, params=params)
-        return response.json()
+        return await self._request('get', path, params=params)
     
-    def get_health(self, symbol: str) -> dict:
+    async def get_health(self, symbol: str) -> dict:
         """
         Fetches the health status of the exchange for a given symbol.
         :param symbol: The product code for which to fetch the health status.
@@ -37,30 +44,25 @@ class ExchangeClient:
         """
         path = "/v1/getboardstate"
         params = {"product_code": symbol}
-        response = requests.get(self.base_url + path, params=params)
-        return response.json()
+        return await self._request('get', path, params=params)
     
-    def get_balance(self) -> list:
+    async def get_balance(self) -> list:
         """
         Fetches the balance of the account.
         :return: A dictionary containing the account balance.
         """
         path = "/v1/me/getbalance"
-        headers = self._get_auth_headers('get', path)
-        response = requests.get(self.base_url + path, headers=headers)
-        return response.json()
+        return await self._request('get', path, private=True)
     
-    def get_collateral(self) -> dict:
+    async def get_collateral(self) -> dict:
         """
         Fetches the collateral information of the account.
         :return: A dictionary containing the collateral information.
         """
         path = "/v1/me/getcollateral"
-        headers = self._get_auth_headers('get', path)
-        response = requests.get(self.base_url + path, headers=headers)
-        return response.json()
+        return await self._request('get', path, private=True)
     
-    def create_order(self, symbol: str, side: Literal["buy", "sell"], size: float, price: float = None, order_type: str = Literal["limit", "market"]) -> dict:
+    async def create_order(self, symbol: str, side: Literal["buy", "sell"], size: float, price: float = None, order_type: str = Literal["limit", "market"]) -> dict:
         """
         Creates a new order.
         :param symbol: The product code for the order.
@@ -78,11 +80,13 @@ class ExchangeClient:
             "price": price,
             "size": size,
         })
-        headers = self._get_auth_headers('post', path, data=data)
-        response = requests.post(self.base_url + path, data=data, headers=headers)
-        return response.json()
+        response = await self._request('post', path, data=data, private=True)
+        context = message_context.get()
+        if context is not None:
+            context.stamp_total('order')
+        return response
     
-    def cancel_order(self, symbol: str, order_id: str = None, child_order_acceptance_id: str = None) -> dict:
+    async def cancel_order(self, symbol: str, order_id: str = None, child_order_acceptance_id: str = None) -> dict:
         """
         Cancels an existing order.
         :param order_id: The ID of the order to cancel.
@@ -100,11 +104,10 @@ class ExchangeClient:
                 "product_code": symbol,
                 "child_order_acceptance_id": child_order_acceptance_id,
             })
-        headers = self._get_auth_headers('post', path, data=data)
-        response = requests.post(self.base_url + path, data=data, headers=headers)
+        await self._request('post', path, data=data, private=True, expect_json=False)
         return True
     
-    def get_orders(self, symbol: str, order_state: str = None) -> list:
+    async def get_orders(self, symbol: str, order_state: str = None) -> list:
         """
         Fetches all orders or orders for a specific symbol.
         :param symbol: The product code for which to fetch the orders.
@@ -112,11 +115,9 @@ class ExchangeClient:
         """
         path = "/v1/me/getchildorders"
         params = {"product_code": symbol, "child_order_state": order_state}
-        headers = self._get_auth_headers('get', path, params=params)
-        response = requests.get(self.base_url + path, params=params, headers=headers)
-        return response.json()
+        return await self._request('get', path, params=params, private=True)
     
-    def get_positions(self, symbol: str) -> dict:
+    async def get_positions(self, symbol: str) -> dict:
         """
         Fetches the positions for a given symbol.
         :param symbol: The product code for which to fetch positions.
@@ -124,11 +125,9 @@ class ExchangeClient:
         """
         path = "/v1/me/getpositions"
         params = {"product_code": symbol}
-        headers = self._get_auth_headers('get', path, params=params)
-        response = requests.get(self.base_url + path, params=params, headers=headers)
-        return response.json()
+        return await self._request('get', path, params=params, private=True)
     
-    def get_collateral_history(self, count: int = 100, before: int = None, after: int = None) -> list:
+    async def get_collateral_history(self, count: int = 100, before: int = None, after: int = None) -> list:
         """
         Fetches the collateral history of the account.
         :param count: The number of records to fetch.
@@ -137,16 +136,10 @@ class ExchangeClient:
         :return: A list containing the collateral history records.
         """
         path = "/v1/me/getcollateralhistory"
-        params = {"count": count}
-        if before is not None:
-            params["before"] = before
-        if after is not None:
-            params["after"] = after
-        headers = self._get_auth_headers('get', path, params=params)
-        response = requests.get(self.base_url + path, params=params, headers=headers)
-        return response.json()
+        params = {"count": count, "before": before, "after": after}
+        return await self._request('get', path, params=params, private=True)
     
-    def get_trading_commission(self, symbol: str) -> dict:
+    async def get_trading_commission(self, symbol: str) -> dict:
         """
         Fetches the trading commission for a given symbol.
         :param symbol: The product code for which to fetch the trading commission.
@@ -154,9 +147,75 @@ class ExchangeClient:
         """
         path = "/v1/me/gettradingcommission"
         params = {"product_code": symbol}
-        headers = self._get_auth_headers('get', path, params=params)
-        response = requests.get(self.base_url + path, params=params, headers=headers)
-        return response.json()
+        return await self._request('get', path, params=params, private=True)
+    
+    async def close(self) -> None:
+        """
+        Closes the pooled HTTP session.
+        A new session is opened lazily on the next request.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def _request(self, method: Literal["post", "get"], path: str, params: dict = None, data: str = '', private: bool = False, expect_json: bool = True):
+        """
+        Sends a request through the pooled session.
+        The number of requests in flight is bounded by `max_concurrency`, and each request is bounded by `timeout`.
+        :param method: The HTTP method (e.g., 'post', 'get').
+        :param path: The API endpoint path.
+        :param params: The query parameters. Parameters whose value is None are omitted.
+        :param data: The request body data, if applicable.
+        :param private: Whether the endpoint requires authentication headers.
+        :param expect_json: Whether to decode the response body as JSON.
+        :return: The decoded response body, or None when `expect_json` is False.
+        :raises TransactionException: If the request fails, times out, returns an error status or an error object.
+        """
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+        # The query string is built here so that the signed path and the requested URL are identical.
+        path_with_query = f'{path}?{urlencode(params)}' if params else path
+        headers = self._get_auth_headers(method, path, params=params, data=data) if private else {}
+        
+        session = self._get_session()
+        endpoint = f'{method.upper()} {path}'
+        try:
+            async with self._semaphore:
+                started_at = time.perf_counter_ns()
+                async with session.request(method.upper(), path_with_query, data=data or None, headers=headers) as response:
+                    if not response.ok:
+                        self._request_errors.labels(endpoint).inc()
+                        raise TransactionException(f"Request to {path} failed with status {response.status}: {await response.text()}")
+                    if not expect_json:
+                        body = None
+                    else:
+                        body = await response.json(content_type=None)
+                self._request_latency.labels(endpoint).observe_ns(time.perf_counter_ns() - started_at)
+        except asyncio.TimeoutError as e:
+            self._request_errors.labels(endpoint).inc()
+            raise TransactionException(f"Request to {path} timed out after {self.timeout} seconds.") from e
+        except aiohttp.ClientError as e:
+            self._request_errors.labels(endpoint).inc()
+            raise TransactionException(f"Request to {path} failed: {e}") from e
+        # The API may also report an error with a successful status, as an object with an error message.
+        if isinstance(body, dict) and 'error_message' in body:
+            self._request_errors.labels(endpoint).inc()
+            raise TransactionException(f"Request to {path} failed with status {body.get('status')}: {body['error_message']}")
+        return body
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the pooled session, creating it on first use.
+        The session must be created inside the running event loop, so it is not created in the constructor.
+        :return: The keep-alive session bound to `base_url`.
+        """
+        if self._session is None or self._session.closed:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._session = aiohttp.ClientSession(
+                base_url=self.base_url,
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
     
     def _get_auth_headers(self, method: Literal["post", "get"], path: str, params: dict = {}, data: str = '') -> dict:
         """
@@ -178,10 +237,27 @@ class ExchangeClient:
             "Content-Type": 'application/json',
         }
     
-    def __init__(self, base_url: str, api_key: str, api_secret: str):
+    @inject
+    def __init__(self,
+                 base_url: str,
+                 api_key: str,
+                 api_secret: str,
+                 timeout: float = 10.0,
+                 max_concurrency: int = 10,
+                 metrics: MetricsRegistry = Provide['metrics']):
         """
         Initializes the ExchangeClient with API credentials and base URL.
+        :param base_url: The base URL of the REST API. One pooled session is kept per client, and so per base URL.
+        :param timeout: The total timeout of a single request in seconds.
+        :param max_concurrency: The maximum number of requests in flight at the same time.
+        :param metrics: The registry of the request latency and error metrics.
         """
         self.base_url = base_url
+        self.timeout = float(timeout)
+        self.max_concurrency = int(max_concurrency)
         self._api_key = api_key
-        self._api_secret = api_secret
\ No newline at end of file
+        self._api_secret = api_secret
+        self._session = None
+        self._semaphore = None
+        self._request_latency = metrics.summary('bot_rest_request_latency_seconds', 'Latency of REST requests per endpoint.', ('endpoint',))
+        self._request_errors = metrics.counter('bot_rest_request_errors_total', 'Failed REST requests per endpoint.', ('endpoint',))
\ No newline at end of file
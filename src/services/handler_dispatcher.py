@@ -1,29 +1,112 @@
-from typing import List
+from typing import Dict, List
 import dataclasses
 import asyncio
+import inspect
+import time
 
 from message_handlers import MessageHandler
 from .exception import LogicException
+from .latency import message_context
+
+
+@dataclasses.dataclass(slots=True)
+class DispatchStats:
+    """Dispatch latency counters of a channel."""
+    count: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
 
 
 @dataclasses.dataclass
 class HandlerDispatcher:
     """
     HandlerDispatcher is responsible for dispatching messages to the appropriate handlers.
-    It checks the channel of the incoming message and calls the corresponding handler's method.
+    Routing is resolved once, when handlers are registered, into a table from channel to handlers,
+    so dispatching a message costs a single dictionary lookup however many channels and handlers there are.
     """
     handlers: List[MessageHandler]
+    _routes: Dict[str, List[MessageHandler]] = dataclasses.field(init=False, repr=False)
+    _stats: Dict[str, DispatchStats] = dataclasses.field(init=False, repr=False)
+    
+    def __post_init__(self):
+        handlers = self.handlers
+        self.handlers = []
+        self._routes = {}
+        self._stats = {}
+        for handler in handlers:
+            self.register(handler)
+    
+    def register(self, handler: MessageHandler) -> None:
+        """
+        Validate a handler and add it to the routing table of each of its channels.
+        :param handler: The handler to register.
+        """
+        if not inspect.iscoroutinefunction(getattr(handler, 'handle_message', None)):
+            raise LogicException(f"Handler {handler.__class__.__name__} does not implement handle_message method.")
+        channel_names = handler.channel_names
+        if not channel_names or not all(isinstance(channel, str) for channel in channel_names):
+            raise LogicException(f"Handler {handler.__class__.__name__} does not declare its channel names.")
+        
+        self.handlers.append(handler)
+        for channel in dict.fromkeys(channel_names):
+            self._routes.setdefault(channel, []).append(handler)
+            self._stats.setdefault(channel, DispatchStats())
     
     async def dispatch(self, data: list|dict, channel: str) -> None:
         """
         Dispatch the message to the appropriate handler based on the channel.
+        A single handler is awaited directly, while several handlers run concurrently.
         """
-        tasks = []
-        for handler in self.handlers:
-            if hasattr(handler, 'handle_message'):
-                if channel in handler.channel_names:
-                    tasks.append(handler.handle_message(data, channel))
+        handlers = self._routes.get(channel)
+        if handlers is None:
+            return
+        started_at = time.perf_counter_ns()
+        try:
+            if len(handlers) == 1:
+                await handlers[0].handle_message(data, channel)
             else:
-                raise LogicException(f"Handler {handler.__class__.__name__} does not implement handle_message method.")
-        if tasks:
-            await asyncio.gather(*tasks)
\ No newline at end of file
+                await asyncio.gather(*[handler.handle_message(data, channel) for handler in handlers])
+        finally:
+            context = message_context.get()
+            if context is not None:
+                context.stamp('dispatch')
+            elapsed = time.perf_counter_ns() - started_at
+            stats = self._stats[channel]
+            stats.count += 1
+            stats.total_ns += elapsed
+            if elapsed > stats.max_ns:
+                stats.max_ns = elapsed
+    
+    async def overflow(self, channel: str) -> None:
+        """
+        Tell the handlers of a channel that its pending messages were dropped because its queue was full.
+        """
+        handlers = self._routes.get(channel)
+        if handlers is None:
+            return
+        await asyncio.gather(*[handler.overflow(channel) for handler in handlers])
+    
+    async def reset(self) -> None:
+        """
+        Reset the state of every handler, e.g. after a reconnection.
+        """
+        await asyncio.gather(*[handler.reset() for handler in self.handlers])
+    
+    @property
+    def channels(self) -> List[str]:
+        """The channels that have at least one handler."""
+        return list(self._routes)
+    
+    def get_dispatch_metrics(self) -> Dict[str, dict]:
+        """
+        Get the dispatch latency counters of every channel.
+        :return: A dictionary of counters keyed by channel.
+        """
+        return {
+            channel: {
+                'count': stats.count,
+                'average_us': stats.total_ns / stats.count / 1000 if stats.count else 0.0,
+                'max_us': stats.max_ns / 1000,
+            }
+            for channel, stats in self._stats.items()
+        }
\ No newline at end of file
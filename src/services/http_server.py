@@ -1,52 +1,180 @@
-from threading import Thread
 from typing import Optional
+import asyncio
+import dataclasses
+import json
+import time
 
-from flask import Flask, jsonify
+from aiohttp import web
+
+from dependency_injector.wiring import inject, Provide
+
+from .latency import LatencyRecorder
+from .metrics import MetricsRegistry
+from .event_bus import EventBus
+from .watchdog import Watchdog
+from .portfolio import Portfolio
+from .shard_registry import ShardRegistry
 
 
 class HttpServer:
-    app: Flask
+    """
+    An HTTP server running on the event loop of the bot, so routes read the state of the services directly.
+    Every request is timed from routing to the response, exposed per route as `bot_http_request_latency_seconds`
+    and in the Server-Timing header of non-streaming responses.
+    """
+    app: web.Application
     host: str
     port: int
     debug: bool
-    _server_thread: Optional[Thread]
+    _runner: Optional[web.AppRunner]
     
     def _register_routes(self):
-        @self.app.route('/health', methods=['GET'])
-        def health():
-            return jsonify({
-                'status': 'healthy',
-            })
-        
-        @self.app.errorhandler(404)
-        def not_found(error):
-            return jsonify({'error': 'Not found'}), 404
-        
-        @self.app.errorhandler(500)
-        def internal_error(error):
-            return jsonify({'error': 'Internal server error'}), 500
+        self.app.router.add_get('/health', self.health)
+        self.app.router.add_get('/latency', self.get_latency)
+        self.app.router.add_get('/metrics', self.get_metrics)
+        self.app.router.add_get('/state', self.get_state)
+        self.app.router.add_get('/events', self.stream_events)
+        self.app.router.add_get('/watchdog', self.get_watchdog_report)
+    
+    @web.middleware
+    async def _measure(self, request: web.Request, handler) -> web.StreamResponse:
+        """
+        Time every request and turn errors into JSON responses.
+        """
+        started_at = time.perf_counter_ns()
+        try:
+            response = await handler(request)
+        except web.HTTPNotFound:
+            response = web.json_response({'error': 'Not found'}, status=404)
+        except web.HTTPException:
+            raise
+        except Exception as e:
+            body = {'error': 'Internal server error'}
+            if self.debug:
+                body['detail'] = repr(e)
+            response = web.json_response(body, status=500)
+        elapsed = time.perf_counter_ns() - started_at
+        resource = getattr(request.match_info.route, 'resource', None)
+        route = resource.canonical if resource is not None else 'unmatched'
+        self._request_latency.labels(route).observe_ns(elapsed)
+        if not response.prepared:
+            response.headers['Server-Timing'] = f'app;dur={elapsed / 1e6:.3f}'
+        return response
+    
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'status': 'healthy',
+        })
+    
+    async def get_latency(self, request: web.Request) -> web.Response:
+        return web.json_response(self.latency.get_metrics())
+    
+    async def get_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.metrics.render().encode(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+    
+    async def get_watchdog_report(self, request: web.Request) -> web.Response:
+        return web.json_response(self.watchdog.get_report())
+    
+    @inject
+    async def get_state(self,
+                        request: web.Request,
+                        shards: ShardRegistry = Provide['shards'],
+                        portfolio: Portfolio = Provide['portfolio']) -> web.Response:
+        """
+        Get the orders, positions and balances the bot currently holds, from its local books without calling the exchange.
+        """
+        products = {}
+        for shard in shards:
+            products[shard.product_code] = {
+                'halted': shard.halted,
+                'active_orders': [dataclasses.asdict(order) for order in await shard.order_book.get_active_orders()],
+                'positions': [dataclasses.asdict(position) for position in await shard.position_book.get_positions()],
+                'net_exposure': await shard.position_book.get_net_exposure(),
+                'average_price': await shard.position_book.get_average_price(),
+                'crypto_currency_amount': await portfolio.get_crypto_currency_amount(shard.product_code),
+            }
+        return web.json_response({
+            'products': products,
+            'portfolio': {
+                'legal_currency_amount': await portfolio.get_legal_currency_amount(),
+                'collateral_amount': await portfolio.get_collateral_amount(),
+                'realized_pnl': await portfolio.get_realized_pnl(),
+                'total_commission': await portfolio.get_total_commission(),
+                'drift': await portfolio.get_drift(),
+            },
+        }, dumps=lambda data: json.dumps(data, default=str))
+    
+    async def stream_events(self, request: web.Request) -> web.StreamResponse:
+        """
+        Stream the events of the bot, such as decisions and fills, as server-sent events.
+        A comment is sent after `keepalive` seconds without events so that idle connections are not closed by proxies.
+        """
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+        })
+        await response.prepare(request)
+        subscription = self.event_bus.subscribe()
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    await response.write(b': keepalive\n\n')
+                    continue
+                await response.write(f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n".encode())
+        except ConnectionResetError:
+            pass
+        finally:
+            self.event_bus.unsubscribe(subscription)
+        return response
     
     async def run(self):
-        def run_server():
-            self.app.run(
-                host=self.host,
-                port=self.port,
-                debug=self.debug,
-                use_reloader=False,
-                threaded=True
-            )
-        
-        self._server_thread = Thread(target=run_server, daemon=True)
-        self._server_thread.start()
+        """
+        Start serving on the running event loop.
+        """
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+    
+    async def close(self):
+        """
+        Stop serving and close open connections, including event streams.
+        """
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
     
+    @inject
     def __init__(self, 
                  host: str = '0.0.0.0',
                  port: int = 8080,
-                 debug: bool = False):
+                 debug: bool = False,
+                 keepalive: float = 15.0,
+                 latency: LatencyRecorder = Provide['latency'],
+                 metrics: MetricsRegistry = Provide['metrics'],
+                 event_bus: EventBus = Provide['event_bus'],
+                 watchdog: Watchdog = Provide['watchdog']):
+        """
+        :param host: The host to listen on.
+        :param port: The port to listen on.
+        :param debug: Whether to include the error in the body of internal server errors.
+        :param keepalive: The longest silence in seconds on an event stream.
+        :param latency: The recorder of the pipeline latency, served at /latency.
+        :param metrics: The metrics registry, served at /metrics.
+        :param event_bus: The source of the events served at /events.
+        :param watchdog: The event loop watchdog, whose report is served at /watchdog.
+        """
         self.host = host
-        self.port = port
-        self.debug = debug
-        self.app = Flask(__name__)
-        self._server_thread = None
+        self.port = int(port)
+        self.debug = str(debug).lower() in ('1', 'true', 'yes')
+        self.keepalive = float(keepalive)
+        self.latency = latency
+        self.metrics = metrics
+        self.event_bus = event_bus
+        self.watchdog = watchdog
+        self.app = web.Application(middlewares=[self._measure])
+        self._runner = None
+        self._request_latency = metrics.summary('bot_http_request_latency_seconds', 'Time to handle HTTP requests per route.', ('route',))
         
         self._register_routes()
\ No newline at end of file
@@ -0,0 +1,244 @@
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple, TYPE_CHECKING
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import asyncio
+
+import numpy as np
+
+from .exception import LogicException
+
+if TYPE_CHECKING:
+    # Imported for type checking only, since agents depend on services.
+    from agents import Agent
+
+
+_worker_predictors: Dict[Tuple[type, str], Any] = {}
+_WORKER_MODELS_PER_AGENT = 2
+
+
+def _predict_in_worker(agent_class: type, model_path: str, shm_name: str, shape: tuple, dtype: str) -> list:
+    """
+    Run a batch in an inference worker process.
+    The model is loaded once per worker and kept, and the batch is read from shared memory without being pickled.
+    """
+    key = (agent_class, model_path)
+    predictor = _worker_predictors.pop(key, None)
+    if predictor is None:
+        # The two most recently used models of each agent class are kept, so that a model warmed up for a swap does not
+        # evict the model still serving batches until the swap, while a swapped out model is released on the next swap.
+        keys = [other for other in _worker_predictors if other[0] is agent_class]
+        for other in keys[:max(0, len(keys) - (_WORKER_MODELS_PER_AGENT - 1))]:
+            del _worker_predictors[other]
+        predictor = agent_class.load_predictor(model_path)
+    # Reinserting keeps the dictionary in least recently used order.
+    _worker_predictors[key] = predictor
+    shm = SharedMemory(name=shm_name)
+    try:
+        observations = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        actions = list(predictor(observations))
+        del observations
+        return actions
+    finally:
+        shm.close()
+
+
+class _PendingBatch:
+    """Observations waiting to be run together, copied into one preallocated batch array."""
+    __slots__ = ('agent', 'observations', 'shm', 'requests', 'slots', 'timer')
+    
+    def __init__(self, agent: 'Agent', shape: tuple, dtype: np.dtype, max_batch_size: int, shared: bool):
+        self.agent = agent
+        self.shm = None
+        if shared:
+            self.shm = SharedMemory(create=True, size=max(1, max_batch_size * int(np.prod(shape)) * np.dtype(dtype).itemsize))
+            self.observations = np.ndarray((max_batch_size, *shape), dtype=dtype, buffer=self.shm.buf)
+        else:
+            self.observations = np.empty((max_batch_size, *shape), dtype=dtype)
+        self.requests: List[Tuple[asyncio.Future, int, int]] = []  # (future, agent id, generation)
+        self.slots: Dict[int, int] = {}  # agent id -> index in the batch
+        self.timer: Optional[asyncio.TimerHandle] = None
+    
+    def release(self):
+        self.observations = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class InferenceService:
+    """
+    Service that batches the inference requests of agents sharing a model.
+    Observations are collected for up to `batch_window_ms` or `max_batch_size` items per `Agent.batch_key`,
+    stacked into one batch, run in a single forward pass, and the actions are handed back to each caller.
+    The extra latency of a request is bounded by `batch_window_ms`.
+    
+    Batches run off the event loop according to `mode`:
+    `thread` runs `Agent.predict` in a thread pool, which suits models that release the GIL such as torch,
+    `process` runs the predictor of `Agent.load_predictor` in a process pool with the batch in shared memory,
+    and `inline` runs `Agent.predict` on the event loop.
+    A request is stale once a newer observation of the same agent is submitted: a pending stale request is replaced
+    in its batch, and the result of a running stale request is discarded. Stale requests resolve to None.
+    """
+    MODES = ('inline', 'thread', 'process')
+    
+    _pending: Dict[Hashable, _PendingBatch]
+    _generations: Dict[int, int]
+    _running: Set[asyncio.Task]
+    _executor: Optional[Executor]
+    
+    async def infer(self, agent: 'Agent', observations: np.ndarray) -> Any:
+        """
+        Get the action of an agent for one observation window.
+        :param agent: The agent whose model to run.
+        :param observations: The observation window. It is copied, so a view into the data store may be passed.
+        :return: The action, or None if the request became stale before its action was available.
+        """
+        key = agent.batch_key
+        agent_id = id(agent)
+        generation = self._generations[agent_id] = self._generations.get(agent_id, 0) + 1
+        
+        batch = self._pending.get(key)
+        if batch is not None and batch.observations.shape[1:] != observations.shape:
+            # Windows of different shapes cannot be stacked, so the pending batch is run as is.
+            self._flush(key)
+            batch = None
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch(agent, observations.shape, observations.dtype, self.max_batch_size, shared=self.mode == 'process')
+            batch.timer = asyncio.get_running_loop().call_later(self.batch_window_ms / 1000, self._flush, key)
+        
+        future = asyncio.get_running_loop().create_future()
+        index = batch.slots.get(agent_id)
+        if index is not None:
+            # A newer observation of the same agent replaces the pending one instead of taking another slot.
+            stale_future = batch.requests[index][0]
+            stale_future.set_result(None)
+            self.stale += 1
+            batch.requests[index] = (future, agent_id, generation)
+        else:
+            index = batch.slots[agent_id] = len(batch.requests)
+            batch.requests.append((future, agent_id, generation))
+        batch.observations[index] = observations
+        
+        if len(batch.requests) >= self.max_batch_size:
+            self._flush(key)
+        return await future
+    
+    def _flush(self, key: Hashable) -> None:
+        """
+        Start running a pending batch.
+        """
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+    
+    async def _run(self, batch: _PendingBatch) -> None:
+        """
+        Run a batch and resolve the futures of its requests.
+        """
+        size = len(batch.requests)
+        try:
+            actions = await self._predict(batch, size)
+        except Exception as e:
+            for future, _, _ in batch.requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            batch.release()
+        
+        for (future, agent_id, generation), action in zip(batch.requests, actions):
+            if future.done():
+                continue
+            if self._generations.get(agent_id) != generation:
+                self.stale += 1
+                future.set_result(None)
+            else:
+                future.set_result(action)
+        self.batches += 1
+        self.items += size
+    
+    async def _predict(self, batch: _PendingBatch, size: int) -> list:
+        """
+        Run the first `size` observations of a batch where the mode says.
+        """
+        loop = asyncio.get_running_loop()
+        if self.mode == 'inline':
+            return batch.agent.predict(batch.observations[:size])
+        if self.mode == 'thread':
+            return await loop.run_in_executor(self._executor, batch.agent.predict, batch.observations[:size])
+        return await loop.run_in_executor(
+            self._executor, _predict_in_worker,
+            type(batch.agent), batch.agent.model_path, batch.shm.name, (size, *batch.observations.shape[1:]), batch.observations.dtype.str
+        )
+    
+    async def warm_up(self, agent: 'Agent', shape: tuple, dtype: str = 'float64') -> None:
+        """
+        Run full batches of zeros through the model of an agent, one per worker,
+        so that model loading and lazy initialization happen before the first real request.
+        :param agent: The agent whose model to warm up.
+        :param shape: The shape of one observation window.
+        :param dtype: The dtype of the observations.
+        :raises LogicException: If the agent cannot run in the configured mode.
+        """
+        if self.mode == 'process' and not agent.supports_worker_processes():
+            raise LogicException(f"{agent.__class__.__name__} does not implement load_predictor, which the process inference mode requires.")
+        count = self.workers if self.mode == 'process' else 1
+        batches = [_PendingBatch(agent, shape, dtype, self.max_batch_size, shared=self.mode == 'process') for _ in range(count)]
+        try:
+            for batch in batches:
+                batch.observations[:] = 0
+            await asyncio.gather(*(self._predict(batch, self.max_batch_size) for batch in batches))
+        finally:
+            for batch in batches:
+                batch.release()
+    
+    def close(self) -> None:
+        """
+        Shut down the inference workers.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def get_metrics(self) -> dict:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'average_batch_size': self.items / self.batches if self.batches else 0.0,
+            'stale': self.stale,
+        }
+    
+    def __init__(self,
+                 batch_window_ms: float = 2.0,
+                 max_batch_size: int = 16,
+                 mode: str = 'thread',
+                 workers: int = 1):
+        """
+        :param batch_window_ms: The longest time a request waits for other requests to join its batch.
+        :param max_batch_size: The number of requests at which a batch is run without waiting.
+        :param mode: Where batches run, one of `inline`, `thread` or `process`.
+        :param workers: The number of inference threads or processes.
+        """
+        if mode not in self.MODES:
+            raise LogicException(f"Unknown inference mode: {mode}")
+        self.batch_window_ms = float(batch_window_ms)
+        self.max_batch_size = int(max_batch_size)
+        self.mode = mode
+        self.workers = int(workers)
+        if mode == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='inference')
+        elif mode == 'process':
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = None
+        self._pending = {}
+        self._generations = {}
+        self._running = set()
+        self.batches = 0
+        self.items = 0
+        self.stale = 0
\ No newline at end of file
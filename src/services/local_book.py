@@ -0,0 +1,95 @@
+from typing import List, Optional, Tuple
+from itertools import islice
+import operator
+
+from sortedcontainers import SortedDict
+
+
+class LocalBook:
+    """
+    A local L2 limit order book maintained from one board snapshot and the subsequent board diffs.
+    Price levels are kept in sorted dictionaries, so each level update costs O(log n)
+    and the best levels are read without parsing a full snapshot.
+    The book is not `ready` until a snapshot has been loaded, and diffs received before that are ignored.
+    """
+    ready: bool
+    _bids: SortedDict
+    _asks: SortedDict
+    
+    def load_snapshot(self, data: dict) -> None:
+        """
+        Replace the whole book with a board snapshot.
+        :param data: The board snapshot with `bids` and `asks` lists of price and size dictionaries.
+        """
+        self._bids = SortedDict(operator.neg, ((level['price'], level['size']) for level in data['bids'] if level['size'] > 0))
+        self._asks = SortedDict(((level['price'], level['size']) for level in data['asks'] if level['size'] > 0))
+        self.ready = True
+    
+    def apply(self, data: dict) -> bool:
+        """
+        Apply a board diff. A level whose size is zero is removed.
+        bitFlyer diffs carry no sequence number, so a gap is detected by checking the book against the diff:
+        the book must not be crossed and its mid price must match the `mid_price` of the diff.
+        :param data: The board diff with `mid_price`, `bids` and `asks`.
+        :return: False if the book is inconsistent after the diff and must be resynchronized, else True.
+        """
+        if not self.ready:
+            return True
+        for levels, book in ((data['bids'], self._bids), (data['asks'], self._asks)):
+            for level in levels:
+                if level['size'] > 0:
+                    book[level['price']] = level['size']
+                else:
+                    book.pop(level['price'], None)
+        
+        best_bid = self.best_bid()
+        best_ask = self.best_ask()
+        if best_bid is None or best_ask is None:
+            return True
+        if best_bid[0] >= best_ask[0]:
+            return False
+        mid_price = data.get('mid_price')
+        # The tolerance is relative, so that a gap of a few ticks is caught on cheap products as on expensive ones.
+        if mid_price is not None and abs((best_bid[0] + best_ask[0]) / 2 - mid_price) > self.mid_price_tolerance * abs(mid_price):
+            return False
+        return True
+    
+    def invalidate(self) -> None:
+        """
+        Mark the book as out of sync until the next snapshot is loaded.
+        """
+        self.ready = False
+        self._bids.clear()
+        self._asks.clear()
+    
+    def best_bid(self) -> Optional[Tuple[float, float]]:
+        return self._bids.peekitem(0) if self._bids else None
+    
+    def best_ask(self) -> Optional[Tuple[float, float]]:
+        return self._asks.peekitem(0) if self._asks else None
+    
+    def mid_price(self) -> Optional[float]:
+        best_bid = self.best_bid()
+        best_ask = self.best_ask()
+        if best_bid is None or best_ask is None:
+            return None
+        return (best_bid[0] + best_ask[0]) / 2
+    
+    def levels(self, depth: int) -> Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]:
+        """
+        Get the best price levels of each side.
+        :param depth: The number of levels per side.
+        :return: The bid and ask levels as (price, size) pairs, best level first.
+        """
+        return list(islice(self._bids.items(), depth)), list(islice(self._asks.items(), depth))
+    
+    def __init__(self,
+                 mid_price_tolerance: float = 1e-7):
+        """
+        :param mid_price_tolerance: The largest accepted difference between the local mid price and the mid price of a diff,
+            relative to the mid price of the diff.
+        """
+        self.mid_price_tolerance = float(mid_price_tolerance)
+        self.ready = False
+        self._bids = SortedDict(operator.neg)
+        self._asks = SortedDict()
\ No newline at end of file
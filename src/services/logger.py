@@ -1,26 +1,219 @@
+from typing import Deque, Dict, List
+from collections import deque
+import datetime
+import json
 import os
+import sys
+import threading
+import time
 
-from logging import Logger, getLogger, DEBUG, INFO, FileHandler, Formatter
+from logging import Logger, LogRecord, getLogger, DEBUG, INFO, WARNING, Formatter
+from logging.handlers import QueueHandler
+
+
+class JsonFormatter(Formatter):
+    """Formats records as JSON lines."""
+    
+    def format(self, record: LogRecord) -> str:
+        line = {
+            'time': datetime.datetime.fromtimestamp(record.created).isoformat(),
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        if record.exc_text:
+            line['exception'] = record.exc_text
+        return json.dumps(line, ensure_ascii=False)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    A queue handler that never blocks: a record that does not fit in the queue is dropped and counted.
+    The queue is a plain deque drained by polling, so enqueuing takes no lock and wakes no thread.
+    """
+    def prepare(self, record: LogRecord) -> LogRecord:
+        """
+        Merge the arguments and the traceback into the record before it leaves the thread,
+        since they may change or be gone by the time the writer formats it.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: LogRecord) -> None:
+        if len(self.queue) >= self.max_size:
+            self.dropped += 1
+        else:
+            self.queue.append(record)
+    
+    def __init__(self, log_queue: Deque[LogRecord], max_size: int):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self._formatter = Formatter()
+        self.dropped = 0
+
+
+class _RotatingFile:
+    """
+    An append-only log file rotated by size and by age, keeping `backup_count` numbered backups.
+    """
+    def write(self, text: str) -> None:
+        if self._should_rotate(len(text)):
+            self._rotate()
+        self._file.write(text)
+        self._size += len(text)
+    
+    def flush(self) -> None:
+        self._file.flush()
+    
+    def _should_rotate(self, length: int) -> bool:
+        if self.max_bytes and self._size and self._size + length > self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and time.time() - self._opened_at >= self.rotate_interval
+    
+    def _rotate(self) -> None:
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{i}"):
+                    os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+    
+    def _open(self) -> None:
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+        self._opened_at = time.time()
+    
+    def close(self) -> None:
+        self._file.close()
+    
+    def __init__(self, path: str, max_bytes: int = 0, backup_count: int = 5, rotate_interval: float = 0):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.backup_count = int(backup_count)
+        self.rotate_interval = float(rotate_interval)
+        self._open()
 
 
 class Logger:
+    """
+    The System and Transaction loggers of the bot.
+    Logging calls only put the record on a bounded queue, so they never wait for the disk. A background thread
+    writes the records in batches, with one write and one flush per file per batch, and rotates the files by size
+    and age. When the queue is full, records are dropped and counted, and the drop is noted in the system log.
+    """
     formatter: Formatter = None
     system: Logger = None
     transaction: Logger = None
+    _handlers: Dict[str, _DroppingQueueHandler]
+    _files: Dict[str, _RotatingFile]
     
-    def __init__(self):
+    def _write(self) -> None:
+        """
+        Write queued records until `close` is called, from the writer thread.
+        """
+        reported_drops = 0
+        stopping = False
+        while not stopping:
+            stopping = self._stop.wait(self.flush_interval)
+            while self._queue or (stopping and reported_drops < sum(handler.dropped for handler in self._handlers.values())):
+                reported_drops = self._write_batch(reported_drops)
+        
+        for log_file in self._files.values():
+            log_file.close()
+    
+    def _write_batch(self, reported_drops: int) -> int:
+        """
+        Write up to `batch_size` queued records, with one write and one flush per file.
+        :param reported_drops: The number of dropped records already noted in the system log.
+        :return: The number of dropped records noted in the system log after this batch.
+        """
+        records = []
+        while self._queue and len(records) < self.batch_size:
+            records.append(self._queue.popleft())
+        
+        dropped = sum(handler.dropped for handler in self._handlers.values())
+        lines: Dict[str, List[str]] = {}
+        for record in records:
+            lines.setdefault(record.name, []).append(self.formatter.format(record) + '\n')
+        if dropped > reported_drops:
+            note = self.formatter.format(self.system.makeRecord(
+                self.system.name, WARNING, __file__, 0, f"{dropped - reported_drops} log records were dropped because the log queue was full.", None, None
+            ))
+            lines.setdefault(self.system.name, []).append(note + '\n')
+        
+        for name, batch in lines.items():
+            try:
+                self._files[name].write(''.join(batch))
+                self._files[name].flush()
+                self.written += len(batch)
+            except Exception as e:
+                self.errors += 1
+                print(f"Failed to write {len(batch)} records to the {name} log: {e!r}", file=sys.stderr)
+        return dropped
+    
+    def get_metrics(self) -> dict:
+        return {
+            'queued': len(self._queue),
+            'dropped': {name: handler.dropped for name, handler in self._handlers.items()},
+            'written': self.written,
+            'errors': self.errors,
+        }
+    
+    def close(self) -> None:
+        """
+        Write the queued records and stop the writer thread.
+        """
+        self._stop.set()
+        self._thread.join(timeout=5)
+    
+    def __init__(self,
+                 queue_size: int = 10000,
+                 batch_size: int = 512,
+                 flush_interval: float = 0.5,
+                 max_bytes: int = 0,
+                 backup_count: int = 5,
+                 rotate_interval: float = 0,
+                 json_lines: bool = False):
+        """
+        :param queue_size: The number of records that may wait for the writer before records are dropped.
+        :param batch_size: The largest number of records written at once.
+        :param flush_interval: The longest time in seconds the writer waits for records before flushing.
+        :param max_bytes: The size in bytes at which a log file is rotated, or 0 for no size-based rotation.
+        :param backup_count: The number of rotated files kept per log.
+        :param rotate_interval: The age in seconds at which a log file is rotated, or 0 for no time-based rotation.
+        :param json_lines: Whether to write records as JSON lines instead of text.
+        """
         self.system = getLogger('System')
         self.system.setLevel(DEBUG)
         self.transaction = getLogger('Transaction')
         self.transaction.setLevel(INFO)
         
-        self.formatter = Formatter(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        
-        system_log_handler = FileHandler(filename=os.environ.get('SYSTEM_LOG_FILENAME'))
-        system_log_handler.setFormatter(self.formatter)
+        if str(json_lines).lower() in ('1', 'true', 'yes'):
+            self.formatter = JsonFormatter()
+        else:
+            self.formatter = Formatter(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         
-        transaction_log_handler = FileHandler(filename=os.environ.get('TRANSACTION_LOG_FILENAME'))
-        transaction_log_handler.setFormatter(self.formatter)
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+        self.written = 0
+        self.errors = 0
+        self._queue = deque()
+        self._stop = threading.Event()
+        self._files = {
+            self.system.name: _RotatingFile(os.environ.get('SYSTEM_LOG_FILENAME'), max_bytes, backup_count, rotate_interval),
+            self.transaction.name: _RotatingFile(os.environ.get('TRANSACTION_LOG_FILENAME'), max_bytes, backup_count, rotate_interval),
+        }
+        self._handlers = {}
+        for logger in (self.system, self.transaction):
+            handler = self._handlers[logger.name] = _DroppingQueueHandler(self._queue, int(queue_size))
+            logger.addHandler(handler)
         
-        self.system.addHandler(system_log_handler)
-        self.transaction.addHandler(transaction_log_handler)
\ No newline at end of file
+        self._thread = threading.Thread(target=self._write, name='logger', daemon=True)
+        self._thread.start()
\ No newline at end of file
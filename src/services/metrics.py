@@ -0,0 +1,197 @@
+from typing import Callable, Dict, List, Tuple
+import math
+import time
+
+from dependency_injector.wiring import inject, Provide
+
+from .exception import LogicException
+from .latency import Histogram, LatencyRecorder
+from .logger import Logger
+
+
+class Counter:
+    """A monotonically increasing value."""
+    __slots__ = ('value',)
+    
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+    
+    def __init__(self):
+        self.value = 0.0
+
+
+class Gauge:
+    """A value that goes up and down."""
+    __slots__ = ('value',)
+    
+    def set(self, value: float) -> None:
+        self.value = value
+    
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+    
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+    
+    def __init__(self):
+        self.value = 0.0
+
+
+class Summary:
+    """A distribution of durations, kept in a log-linear histogram and exposed as quantiles in seconds."""
+    __slots__ = ('histogram',)
+    
+    def observe_ns(self, elapsed_ns: int) -> None:
+        self.histogram.record(elapsed_ns)
+    
+    def observe(self, seconds: float) -> None:
+        self.histogram.record(int(seconds * 1e9))
+    
+    def __init__(self, histogram: Histogram = None):
+        self.histogram = histogram if histogram is not None else Histogram()
+
+
+class MetricFamily:
+    """
+    A named metric with one child per combination of label values.
+    Children are created on first use and kept, so callers on hot paths may keep the child they get.
+    """
+    TYPES = {'counter': Counter, 'gauge': Gauge, 'summary': Summary}
+    
+    _children: Dict[Tuple[str, ...], Counter|Gauge|Summary]
+    
+    def labels(self, *values: str) -> Counter|Gauge|Summary:
+        """
+        Get the child for some label values, in the order of `label_names`.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise LogicException(f"Metric {self.name} takes labels {self.label_names}, got {values}")
+            child = self._children[values] = self.TYPES[self.type]()
+        return child
+    
+    def __init__(self, name: str, help: str, type: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.label_names = tuple(label_names)
+        self._children = {}
+
+
+class MetricsRegistry:
+    """
+    Service that holds the metrics of the bot and renders them in the Prometheus text format.
+    Metrics are plain attributes updated in place by the services on their hot paths, without locks:
+    the event loop is the only writer, and a scrape reads the values without awaiting, so it never
+    waits on the locks of the services. State that is cheaper to read than to track,
+    such as the size of the order books, is read by collectors at scrape time with lock-free reads.
+    """
+    QUANTILES = (50.0, 90.0, 99.0, 99.9)
+    
+    _families: Dict[str, MetricFamily]
+    _collectors: List[Callable[[], None]]
+    
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> MetricFamily:
+        return self._get_family(name, help, 'counter', labels)
+    
+    def gauge(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> MetricFamily:
+        return self._get_family(name, help, 'gauge', labels)
+    
+    def summary(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> MetricFamily:
+        return self._get_family(name, help, 'summary', labels)
+    
+    def _get_family(self, name: str, help: str, type: str, labels: Tuple[str, ...]) -> MetricFamily:
+        """
+        Get a metric family, registering it on first use. Registering a name twice returns the same family.
+        """
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = MetricFamily(name, help, type, labels)
+        elif family.type != type or family.label_names != tuple(labels):
+            raise LogicException(f"Metric {name} is already registered as a {family.type} with labels {family.label_names}")
+        return family
+    
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """
+        Register a function that updates metrics right before each scrape.
+        Collectors run synchronously within the scrape, so they must only read plain attributes and never take locks.
+        """
+        self._collectors.append(collector)
+    
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                self.logger.system.error(f"Failed to collect metrics: {e!r}")
+        
+        lines = []
+        for family in list(self._families.values()):
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for values, child in list(family._children.items()):
+                labels = self._format_labels(family.label_names, values)
+                if family.type == 'summary':
+                    histogram = child.histogram
+                    count, total = histogram.count, histogram.total
+                    for quantile, value in zip(self.QUANTILES, histogram.get_percentiles(list(self.QUANTILES))):
+                        quantile_labels = self._format_labels(family.label_names + ('quantile',), values + (f"{quantile / 100:g}",))
+                        lines.append(f"{family.name}{quantile_labels} {value / 1e9:.9g}")
+                    lines.append(f"{family.name}_sum{labels} {total / 1e9:.9g}")
+                    lines.append(f"{family.name}_count{labels} {count}")
+                else:
+                    lines.append(f"{family.name}{labels} {self._format_value(child.value)}")
+        return '\n'.join(lines) + '\n'
+    
+    @staticmethod
+    def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+        if not names:
+            return ''
+        pairs = []
+        for name, value in zip(names, values):
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            pairs.append(f'{name}="{value}"')
+        return '{' + ','.join(pairs) + '}'
+    
+    @staticmethod
+    def _format_value(value: float) -> str:
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(float(value))
+    
+    def _collect_logging(self) -> None:
+        metrics = self.logger.get_metrics()
+        self.gauge('bot_log_queue_depth', 'Log records waiting for the writer.').labels().set(metrics['queued'])
+        dropped = self.counter('bot_log_records_dropped_total', 'Log records dropped because the log queue was full, per logger.', ('logger',))
+        for name, count in metrics['dropped'].items():
+            dropped.labels(name).value = count
+        self.counter('bot_log_records_written_total', 'Log records written.').labels().value = metrics['written']
+        self.counter('bot_log_write_errors_total', 'Failed log writes.').labels().value = metrics['errors']
+    
+    def _collect_latency(self) -> None:
+        stages = self.summary('bot_stage_latency_seconds', 'Latency of each stage of the message pipeline.', ('stage',))
+        for stage, histogram in self.latency.get_histograms().items():
+            child = stages.labels(stage)
+            child.histogram = histogram
+    
+    @inject
+    def __init__(self,
+                 latency: LatencyRecorder = Provide['latency'],
+                 logger: Logger = Provide['logger']):
+        """
+        :param latency: The recorder of the latency of each pipeline stage, exposed as `bot_stage_latency_seconds`.
+        :param logger: The logger service to report failing collectors.
+        """
+        self.latency = latency
+        self.logger = logger
+        self._families = {}
+        self._collectors = []
+        self.gauge('bot_start_time_seconds', 'Unix time at which the bot started.').labels().set(time.time())
+        self.add_collector(self._collect_latency)
+        self.add_collector(self._collect_logging)
\ No newline at end of file
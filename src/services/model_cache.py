@@ -0,0 +1,137 @@
+from typing import Dict, Optional
+import asyncio
+import os
+import shutil
+
+from dependency_injector.wiring import inject, Provide
+
+from .logger import Logger
+from .s3client import S3Client, S3ClientException
+
+
+class ModelCache:
+    """
+    Local disk cache of model artifacts stored in S3.
+    Each version of an object is kept at `<cache_dir>/<key>/<etag>/<file name>`. A version is downloaded with
+    concurrent range reads, verified against its ETag and renamed into place, so a file in the cache is always complete.
+    A restart with an unchanged model therefore costs one HEAD request, and with S3 unreachable
+    the most recently cached version is used.
+    """
+    _locks: Dict[str, asyncio.Lock]
+    
+    async def fetch(self, key: str, etag: str = None) -> str:
+        """
+        Get the local path of a model, downloading it if the cached version is missing or outdated.
+        :param key: The key of the model in the bucket.
+        :param etag: The version to fetch. The current version is looked up when not given.
+        :return: The path of the cached file.
+        """
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            if etag is None:
+                try:
+                    etag = await self.get_etag(key)
+                except S3ClientException:
+                    path = self._get_latest_path(key)
+                    if path is None:
+                        raise
+                    self.logger.system.warning(f"Could not look up model {key}, using the cached {path}")
+                    return path
+            
+            path = self.get_path(key, etag)
+            if os.path.exists(path):
+                self.hits += 1
+                return path
+            
+            self.misses += 1
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial_path = f"{path}.{os.getpid()}.part"
+            try:
+                await asyncio.to_thread(self.s3client.download, key, partial_path, etag, self.chunk_size, self.max_concurrency)
+                os.replace(partial_path, path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            self.logger.system.info(f"Downloaded model {key} ({etag}) to {path}")
+            self._prune(key)
+            return path
+    
+    async def get_etag(self, key: str) -> str:
+        """
+        Get the ETag of the current version of a model.
+        :param key: The key of the model in the bucket.
+        """
+        head = await asyncio.to_thread(self.s3client.head_object, key)
+        return head['ETag']
+    
+    def get_path(self, key: str, etag: str) -> str:
+        """
+        Get the path a version of a model is cached at.
+        :param key: The key of the model in the bucket.
+        :param etag: The ETag of the version.
+        """
+        return os.path.join(self._get_key_dir(key), etag.strip('"'), os.path.basename(key))
+    
+    @staticmethod
+    def get_path_etag(path: str) -> str:
+        """
+        Get the ETag of the version cached at a path returned by `fetch`.
+        :param path: The path of the cached file.
+        """
+        return f'"{os.path.basename(os.path.dirname(path))}"'
+    
+    def _get_key_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key.strip('/').replace('/', '__'))
+    
+    def _get_versions(self, key: str) -> list:
+        """
+        Get the cached version directories of a model, newest first.
+        """
+        key_dir = self._get_key_dir(key)
+        if not os.path.isdir(key_dir):
+            return []
+        versions = [os.path.join(key_dir, name) for name in os.listdir(key_dir)]
+        versions = [version for version in versions if os.path.exists(os.path.join(version, os.path.basename(key)))]
+        return sorted(versions, key=os.path.getmtime, reverse=True)
+    
+    def _get_latest_path(self, key: str) -> Optional[str]:
+        versions = self._get_versions(key)
+        return os.path.join(versions[0], os.path.basename(key)) if versions else None
+    
+    def _prune(self, key: str) -> None:
+        """
+        Remove all but the newest `keep_versions` versions of a model.
+        """
+        for version in self._get_versions(key)[self.keep_versions:]:
+            shutil.rmtree(version, ignore_errors=True)
+    
+    def get_metrics(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+    
+    @inject
+    def __init__(self,
+                 cache_dir: str = 'models',
+                 keep_versions: int = 2,
+                 chunk_size: int = 8 * 1024 * 1024,
+                 max_concurrency: int = 4,
+                 s3client: S3Client = Provide['s3client'],
+                 logger: Logger = Provide['logger']):
+        """
+        :param cache_dir: The directory to cache models in.
+        :param keep_versions: The number of versions of each model kept on disk.
+        :param chunk_size: The size of each range read of a download.
+        :param max_concurrency: The number of range reads in flight during a download.
+        :param s3client: The S3 client to download models with.
+        :param logger: The logger service.
+        """
+        self.cache_dir = cache_dir
+        self.keep_versions = int(keep_versions)
+        self.chunk_size = int(chunk_size)
+        self.max_concurrency = int(max_concurrency)
+        self.s3client = s3client
+        self.logger = logger
+        self._locks = {}
+        self.hits = 0
+        self.misses = 0
\ No newline at end of file
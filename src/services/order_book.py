@@ -1,4 +1,5 @@
-from typing import List, Literal
+from typing import Dict, List, Literal
+from collections import OrderedDict
 import dataclasses
 import asyncio
 
@@ -26,14 +27,26 @@ class Order:
     executed_size: float = None
     total_commission: float = None
     time_in_force: Literal['GTC', 'IOC', 'FOK'] = None
+    
+    def __post_init__(self):
+        if self.executed_size is None:
+            self.executed_size = 0.0
+        if self.outstanding_size is None:
+            self.outstanding_size = self.size - self.executed_size
+        if self.total_commission is None:
+            self.total_commission = 0.0
 
 
 class OrderBook:
     """
     Service for managing order book operations.
-    This service can be extended to include methods for adding, removing, or updating orders.
+    Orders are indexed by child_order_acceptance_id and partitioned into active and terminal orders,
+    so that lookups on execution and cancel events take constant time.
+    Terminal orders are retained up to `max_terminal_orders`, evicting the oldest first.
     """
-    _orders: List[Order] = []
+    _active_orders: Dict[str, Order]
+    _terminal_orders: 'OrderedDict[str, Order]'
+    _acceptance_ids: Dict[str, str]
     
     @inject
     async def sync(self,
@@ -43,9 +56,16 @@ class OrderBook:
         This method can be extended to fetch and update order book data from an external source.
         :param exchange_client: The ExchangeClient for fetching order book data.
         """
+        orders = await exchange_client.get_orders(symbol=self.product_code, order_state='ACTIVE')
         async with self.lock:
-            orders = exchange_client.get_orders(symbol=self.crypto_currency_code, order_state='ACTIVE')
-            self._orders = [Order(**order) for order in orders]
+            self._active_orders = {}
+            # Terminal orders are kept, so that late events of recently finished orders are still routed to them.
+            self._acceptance_ids = {
+                order.child_order_id: order.child_order_acceptance_id
+                for order in self._terminal_orders.values() if order.child_order_id is not None
+            }
+            for order in orders:
+                self._index(Order(**order))
     
     async def add(self, order: Order):
         """
@@ -53,7 +73,38 @@ class OrderBook:
         :param order: The order to be added.
         """
         async with self.lock:
-            self._orders.append(order)
+            self._index(order)
+    
+    async def execute(self,
+                      order_id: str,
+                      price: float,
+                      size: float,
+                      commission: float = 0.0,
+                      outstanding_size: float = None) -> Order | None:
+        """
+        Apply an execution to the order with the given ID.
+        The executed size, outstanding size and average price are accumulated incrementally,
+        and the order is completed only once it is fully filled.
+        :param order_id: The child_order_acceptance_id of the executed order.
+        :param price: The execution price.
+        :param size: The executed size.
+        :param commission: The commission charged for the execution.
+        :param outstanding_size: The outstanding size reported by the exchange, which takes precedence over the local one.
+        :return: The updated order if found, else None.
+        """
+        async with self.lock:
+            order = self._active_orders.get(order_id)
+            if order is None:
+                return None
+            executed_size = order.executed_size + size
+            order.average_price = round(((order.average_price or 0.0) * order.executed_size + price * size) / executed_size, 8)
+            order.executed_size = round(executed_size, 8)
+            order.outstanding_size = round(outstanding_size if outstanding_size is not None else order.size - order.executed_size, 8)
+            order.total_commission += commission
+            if order.outstanding_size <= 0:
+                order.outstanding_size = 0.0
+                self._terminate(order_id, 'COMPLETED')
+            return order
     
     async def complete(self, order_id: str) -> Order | None:
         """
@@ -62,11 +113,7 @@ class OrderBook:
         :return: The updated order if found, else None.
         """
         async with self.lock:
-            for order in self._orders:
-                if order.child_order_acceptance_id == order_id and order.child_order_state == 'ACTIVE':
-                    order.child_order_state = 'COMPLETED'
-                    return order
-            return None
+            return self._terminate(order_id, 'COMPLETED')
     
     async def cancel(self, order_id: str) -> Order | None:
         """
@@ -75,30 +122,105 @@ class OrderBook:
         :return: The updated order if found, else None.
         """
         async with self.lock:
-            for order in self._orders:
-                if order.child_order_acceptance_id == order_id and order.child_order_state == 'ACTIVE':
-                    order.child_order_state = 'CANCELED'
-                    return order
-            return None
+            order = self._terminate(order_id, 'CANCELED')
+            if order is not None:
+                order.cancel_size = order.outstanding_size
+                order.outstanding_size = 0.0
+            return order
+    
+    async def get_order(self, order_id: str) -> Order | None:
+        """
+        Get the order with the given ID, whether active or terminal.
+        :param order_id: The child_order_acceptance_id of the order.
+        :return: The order if found, else None.
+        """
+        async with self.lock:
+            return self._active_orders.get(order_id) or self._terminal_orders.get(order_id)
+    
+    async def get_order_by_child_order_id(self, child_order_id: str) -> Order | None:
+        """
+        Get the order with the given child_order_id, whether active or terminal.
+        :param child_order_id: The child_order_id of the order.
+        :return: The order if found, else None.
+        """
+        async with self.lock:
+            order_id = self._acceptance_ids.get(child_order_id)
+            if order_id is None:
+                return None
+            return self._active_orders.get(order_id) or self._terminal_orders.get(order_id)
+    
+    async def get_active_orders(self) -> List[Order]:
+        async with self.lock:
+            return list(self._active_orders.values())
     
     async def get_orders(self) -> List[Order]:
         async with self.lock:
-            return self._orders.copy()
+            return list(self._active_orders.values()) + list(self._terminal_orders.values())
     
     async def flush(self):
+        """
+        Discard all terminal orders.
+        """
         async with self.lock:
-            self._orders = [order for order in self._orders if order.child_order_state == 'ACTIVE']
+            for order in self._terminal_orders.values():
+                self._acceptance_ids.pop(order.child_order_id, None)
+            self._terminal_orders.clear()
+    
+    def _index(self, order: Order):
+        """
+        Insert the order into the partition that matches its state.
+        """
+        if order.child_order_state == 'ACTIVE':
+            self._active_orders[order.child_order_acceptance_id] = order
+        else:
+            self._retain(order)
+        if order.child_order_id is not None:
+            self._acceptance_ids[order.child_order_id] = order.child_order_acceptance_id
+    
+    def _terminate(self, order_id: str, state: str) -> Order | None:
+        """
+        Move an active order to the terminal partition with the given state.
+        """
+        order = self._active_orders.pop(order_id, None)
+        if order is None:
+            return None
+        order.child_order_state = state
+        self._retain(order)
+        return order
+    
+    def _retain(self, order: Order):
+        """
+        Add an order to the terminal partition, evicting the oldest terminal orders beyond `max_terminal_orders`.
+        """
+        self._terminal_orders[order.child_order_acceptance_id] = order
+        while len(self._terminal_orders) > self.max_terminal_orders:
+            _, evicted = self._terminal_orders.popitem(last=False)
+            self._acceptance_ids.pop(evicted.child_order_id, None)
+    
+    def count_active_orders(self) -> int:
+        """
+        Get the number of active orders without taking the lock, e.g. for metrics.
+        """
+        return len(self._active_orders)
     
     def __len__(self):
-        return len(self._orders)
+        return len(self._active_orders) + len(self._terminal_orders)
     
     @inject
     def __init__(self,
+                 product_code: str,
+                 max_terminal_orders: int = 10000,
                  config: dict = Provide['config']):
         """
         Initialize the OrderBook service.
-        This service can be extended to include methods for managing order book data.
+        :param product_code: The product whose orders are kept in this order book.
+        :param max_terminal_orders: The maximum number of completed or canceled orders to retain.
+        :param config: The application container configuration dictionary.
         """
         self.lock = asyncio.Lock()
         self.legal_currency_code = config.get('legal_currency_code')
-        self.crypto_currency_code = config.get('crypto_currency_code')
\ No newline at end of file
+        self.product_code = product_code
+        self.max_terminal_orders = int(max_terminal_orders)
+        self._active_orders = {}
+        self._terminal_orders = OrderedDict()
+        self._acceptance_ids = {}
\ No newline at end of file
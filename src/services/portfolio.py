@@ -1,54 +1,225 @@
+from typing import Dict, Literal, Optional
 import asyncio
+import time
 
 from dependency_injector.wiring import inject, Provide
 
 from .exchange_client import ExchangeClient
+from .logger import Logger
 
 
 class Portfolio:
     """
     Service for managing portfolio-related operations.
-    This service can be extended to include methods for adding, removing, or updating portfolio items.
+    Balances and collateral are kept as a local ledger that is updated from execution events,
+    and reconciled against the exchange by `sync` on a slow schedule.
+    The portfolio is shared by every traded product, with one crypto currency amount per product.
     """
     _legal_currency_amount: float
-    _crypto_currency_amount: float
+    _crypto_currency_amounts: Dict[str, float]
     _collateral_amount: float
+    _realized_pnl: float
+    _total_commission: float
+    _drift: Dict[str, float]
+    _executions: int
+    _synced_at: Optional[float]
+    _pending_sync: Optional[asyncio.Future]
+    
+    MIN_DRIFT = 1e-8  # The smallest amount of a crypto currency, below which drift is rounding error
+    
+    async def apply_execution(self,
+                              product_code: str,
+                              side: Literal['BUY', 'SELL'],
+                              price: float,
+                              size: float,
+                              commission: float = 0.0,
+                              pnl: float = 0.0):
+        """
+        Update the local ledger with an execution, without any REST call.
+        Margin products (FX_*) only move the collateral by the realized PnL net of the commission,
+        while spot products move the legal and crypto currency balances.
+        :param product_code: The product of the execution.
+        :param side: The side of the execution.
+        :param price: The execution price.
+        :param size: The executed size.
+        :param commission: The commission charged in the crypto currency.
+        :param pnl: The realized PnL of the execution in the legal currency.
+        """
+        sign = 1 if side == 'BUY' else -1
+        async with self.lock:
+            self._executions += 1
+            if product_code.startswith('FX_'):
+                # The commission is charged in the crypto currency, so it is taken from the collateral at the execution price.
+                self._collateral_amount += pnl - commission * price
+            else:
+                self._legal_currency_amount -= sign * price * size
+                self._crypto_currency_amounts[product_code] = self._crypto_currency_amounts.get(product_code, 0.0) + sign * size - commission
+            self._realized_pnl += pnl
+            self._total_commission += commission
+    
+    async def sync(self, max_age_ms: float = None):
+        """
+        Synchronize the portfolio data with the exchange and report the drift of the local ledger.
+        Concurrent or back-to-back calls within `sync_window_ms` are merged into a single refresh that every caller awaits.
+        :param max_age_ms: If given, the refresh is skipped when the cached values are younger than this many milliseconds.
+        """
+        if max_age_ms is not None and self._is_fresh(max_age_ms):
+            return
+        if self._pending_sync is None:
+            self._pending_sync = asyncio.ensure_future(self._refresh())
+        # Shield the shared refresh so that a cancelled caller does not cancel it for the others.
+        await asyncio.shield(self._pending_sync)
     
     @inject
-    async def sync(self, 
-                   exchange_client: ExchangeClient = Provide['exchange_client']):
+    async def _refresh(self,
+                       exchange_client: ExchangeClient = Provide['exchange_client']):
         """
-        Synchronize the portfolio data.
-        This method can be extended to fetch and update portfolio data from an external source.
+        Fetch balance and collateral from the exchange once the coalescing window has elapsed.
         :param exchange_client: The ExchangeClient for fetching balance and collateral.
         """
+        try:
+            if self.sync_window_ms > 0:
+                await asyncio.sleep(self.sync_window_ms / 1000)
+        finally:
+            # Callers arriving from now on may have seen newer events, so they schedule a new refresh.
+            self._pending_sync = None
+        
+        # Executions applied while the request is in flight may or may not be in its response,
+        # so the ledger is recorded before the request to tell them apart from drift.
         async with self.lock:
-            balance = exchange_client.get_balance()
-            collateral = exchange_client.get_collateral()
-            
-            self._legal_currency_amount = next(filter(lambda x: x['currency_code'] == self.legal_currency_code, balance), {}).get('amount', 0.0)
-            self._crypto_currency_amount = next(filter(lambda x: x['currency_code'] == self.crypto_currency_code, balance), {}).get('amount', 0.0)
-            self._collateral_amount = collateral.get('collateral', 0.0)
+            executions = self._executions
+            ledger = self._get_ledger()
+        balance, collateral = await asyncio.gather(
+            exchange_client.get_balance(),
+            exchange_client.get_collateral()
+        )
+        
+        legal_currency_amount = next(filter(lambda x: x['currency_code'] == self.legal_currency_code, balance), {}).get('amount', 0.0)
+        # Balances are per currency, so each spot product is matched by its base currency, e.g. BTC for BTC_JPY.
+        # Margin products hold no balance of their own and are reconciled through the collateral.
+        crypto_currency_amounts = {
+            product_code: next(filter(lambda x: x['currency_code'] == self.get_base_currency_code(product_code), balance), {}).get('amount', 0.0)
+            for product_code in self.crypto_currency_codes if not product_code.startswith('FX_')
+        }
+        collateral_amount = collateral.get('collateral', 0.0)
+        
+        async with self.lock:
+            if self._executions != executions:
+                # The response cannot be compared with the ledger, so the executions applied since the request
+                # are kept on top of it instead of being overwritten, and no drift is reported.
+                in_flight = {name: value - ledger.get(name, 0.0) for name, value in self._get_ledger().items()}
+                self.logger.system.info(f"{self._executions - executions} executions were applied during reconciliation, drift is not checked.")
+                legal_currency_amount += in_flight['legal_currency_amount']
+                crypto_currency_amounts = {
+                    product_code: amount + in_flight.get(f'crypto_currency_amount:{product_code}', 0.0)
+                    for product_code, amount in crypto_currency_amounts.items()
+                }
+                collateral_amount += in_flight['collateral_amount']
+            elif self._synced_at is not None:
+                exchange = self._to_ledger(legal_currency_amount, crypto_currency_amounts, collateral_amount)
+                self._drift = {name: value - ledger.get(name, 0.0) for name, value in exchange.items()}
+                for name, drift in self._drift.items():
+                    # The tolerance is relative, since amounts range from fractions of a coin to millions of yen.
+                    if abs(drift) > max(self.drift_tolerance * abs(exchange[name]), self.MIN_DRIFT):
+                        self.logger.system.warning(f"Portfolio drift detected on reconciliation, {name}: {drift}")
+            self._legal_currency_amount = legal_currency_amount
+            self._crypto_currency_amounts = crypto_currency_amounts
+            self._collateral_amount = collateral_amount
+            self._synced_at = time.monotonic()
+    
+    @staticmethod
+    def get_base_currency_code(product_code: str) -> str:
+        """
+        Get the currency a spot product trades, e.g. BTC for BTC_JPY.
+        :param product_code: The spot product code.
+        """
+        return product_code.split('_', 1)[0]
+    
+    def _get_ledger(self) -> Dict[str, float]:
+        """
+        Get the local ledger as a flat dictionary keyed like the drift.
+        """
+        return self._to_ledger(self._legal_currency_amount, self._crypto_currency_amounts, self._collateral_amount)
+    
+    @staticmethod
+    def _to_ledger(legal_currency_amount: float, crypto_currency_amounts: Dict[str, float], collateral_amount: float) -> Dict[str, float]:
+        return {
+            'legal_currency_amount': legal_currency_amount,
+            **{f'crypto_currency_amount:{product_code}': amount for product_code, amount in crypto_currency_amounts.items()},
+            'collateral_amount': collateral_amount,
+        }
     
-    async def get_legal_currency_amount(self) -> float:
+    def _is_fresh(self, max_age_ms: float) -> bool:
+        return self._synced_at is not None and (time.monotonic() - self._synced_at) * 1000 < max_age_ms
+    
+    async def get_legal_currency_amount(self, max_age_ms: float = None) -> float:
+        """
+        :param max_age_ms: If given, the portfolio is synchronized first when the cached value is older than this many milliseconds.
+        """
+        if max_age_ms is not None:
+            await self.sync(max_age_ms=max_age_ms)
         async with self.lock:
             return self._legal_currency_amount
     
-    async def get_crypto_currency_amount(self) -> float:
+    async def get_crypto_currency_amount(self, product_code: str, max_age_ms: float = None) -> float:
+        """
+        :param product_code: The product whose crypto currency amount to get.
+        :param max_age_ms: If given, the portfolio is synchronized first when the cached value is older than this many milliseconds.
+        """
+        if max_age_ms is not None:
+            await self.sync(max_age_ms=max_age_ms)
+        async with self.lock:
+            return self._crypto_currency_amounts.get(product_code, 0.0)
+    
+    async def get_realized_pnl(self) -> float:
         async with self.lock:
-            return self._crypto_currency_amount
+            return self._realized_pnl
     
-    async def get_collateral_amount(self) -> float:
+    async def get_total_commission(self) -> float:
+        async with self.lock:
+            return self._total_commission
+    
+    async def get_drift(self) -> Dict[str, float]:
+        """
+        :return: The difference between the exchange and the local ledger found by the last reconciliation.
+        """
+        async with self.lock:
+            return self._drift.copy()
+    
+    async def get_collateral_amount(self, max_age_ms: float = None) -> float:
+        """
+        :param max_age_ms: If given, the portfolio is synchronized first when the cached value is older than this many milliseconds.
+        """
+        if max_age_ms is not None:
+            await self.sync(max_age_ms=max_age_ms)
         async with self.lock:
             return self._collateral_amount
     
     @inject
     def __init__(self,
+                 sync_window_ms: float = 0,
+                 drift_tolerance: float = 1e-4,
+                 logger: Logger = Provide['logger'],
                  config: dict = Provide['config']):
         """
         Initialize the PortfolioService with amounts and Bitflyer client.
+        :param sync_window_ms: The window in milliseconds during which sync requests are merged into one refresh.
+        :param drift_tolerance: The drift relative to the exchange amount above which a reconciliation is reported as a warning.
+        :param logger: The logger service to report drift.
         :param config: The application container configuration dictionary.
         """
         self.lock = asyncio.Lock()
+        self.logger = logger
         self.legal_currency_code = config.get('legal_currency_code')
-        self.crypto_currency_code = config.get('crypto_currency_code')
\ No newline at end of file
+        self.crypto_currency_codes = config.get('crypto_currency_codes')
+        self.sync_window_ms = float(sync_window_ms)
+        self.drift_tolerance = float(drift_tolerance)
+        self._legal_currency_amount = 0.0
+        self._crypto_currency_amounts = {}
+        self._collateral_amount = 0.0
+        self._realized_pnl = 0.0
+        self._total_commission = 0.0
+        self._drift = {}
+        self._executions = 0
+        self._synced_at = None
+        self._pending_sync = None
\ No newline at end of file
@@ -1,4 +1,5 @@
-from typing import List, Literal
+from typing import Deque, Dict, List, Literal
+from collections import deque
 import dataclasses
 import asyncio
 
@@ -22,12 +23,24 @@ class Position:
     sfd: float = None
 
 
+@dataclasses.dataclass(slots=True)
+class Lot:
+    """
+    A compact record of an open lot, kept in the FIFO queue of its side.
+    """
+    price: float
+    size: float
+
+
 class PositionBook:
     """
     Service for managing position book operations.
-    This service can be extended to include methods for adding, removing, or updating positions.
+    Open positions are kept as FIFO lot queues per side together with running size and notional aggregates,
+    so settlement is amortized O(1) per execution and exposure queries are O(1).
     """
-    _positions: List[Position] = []
+    _lots: Dict[str, Deque[Lot]]
+    _size: Dict[str, float]
+    _notional: Dict[str, float]
     
     @inject
     async def sync(self,
@@ -35,52 +48,110 @@ class PositionBook:
         """
         Synchronize the position book data.
         This method can be extended to fetch and update position book data from an external source.
+        Positions only exist for margin products (FX_*), so the position book of a spot product is left empty.
         :param exchange_client: The ExchangeClient for fetching position book data.
         """
+        if not self.product_code.startswith('FX_'):
+            return
+        positions = await exchange_client.get_positions(symbol=self.product_code)
         async with self.lock:
-            positions = exchange_client.get_positions(symbol=self.crypto_currency_code)
-            self._positions = [Position(**position) for position in positions]
+            self._reset()
+            for position in positions:
+                position = Position(**position)
+                self._open(position.side, position.price, position.size)
     
     async def add_and_settle(self, position: Position) -> float:
         """
         Add a new position to the position book.
-        If an opposite position exists, offset (close) it as needed.
+        The position is netted against the opposite lots in FIFO order, and any remainder is opened as a new lot.
         :param position: The position to be added.
         :return: The realized PnL from offsetting, if any.
         """
+        opposite = 'SELL' if position.side == 'BUY' else 'BUY'
         async with self.lock:
             pnl = 0.0
-            for existing in self._positions:
-                if existing.side != position.side:
-                    if existing.size > position.size:
-                        offset_size = position.size
-                        pnl += (position.price - existing.price) * offset_size if position.side == 'SELL' else (existing.price - position.price) * offset_size
-                        existing.size -= offset_size
-                        return pnl
-                    elif existing.size == position.size:
-                        offset_size = position.size
-                        pnl += (position.price - existing.price) * offset_size if position.side == 'SELL' else (existing.price - position.price) * offset_size
-                        self._positions.remove(existing)
-                        return pnl
-                    elif existing.size < position.size:
-                        offset_size = existing.size
-                        pnl += (position.price - existing.price) * offset_size if position.side == 'SELL' else (existing.price - position.price) * offset_size
-                        position.size -= offset_size
-                        self._positions.remove(existing)
-            self._positions.append(position)
+            remaining = position.size
+            lots = self._lots[opposite]
+            while remaining > self._epsilon and lots:
+                lot = lots[0]
+                offset_size = min(lot.size, remaining)
+                pnl += (position.price - lot.price) * offset_size if position.side == 'SELL' else (lot.price - position.price) * offset_size
+                lot.size = round(lot.size - offset_size, 8)
+                remaining = round(remaining - offset_size, 8)
+                self._size[opposite] = round(self._size[opposite] - offset_size, 8)
+                self._notional[opposite] -= lot.price * offset_size
+                if lot.size <= self._epsilon:
+                    lots.popleft()
+            if not lots:
+                # Clear the floating point residue once a side is flat.
+                self._size[opposite] = 0.0
+                self._notional[opposite] = 0.0
+            if remaining > self._epsilon:
+                self._open(position.side, position.price, remaining)
             return pnl
     
     async def get_positions(self) -> List[Position]:
         async with self.lock:
-            return self._positions.copy()
+            return [
+                Position(product_code=self.product_code, side=side, price=lot.price, size=lot.size)
+                for side, lots in self._lots.items() for lot in lots
+            ]
+    
+    async def get_net_exposure(self) -> float:
+        """
+        :return: The net open size, positive when long and negative when short.
+        """
+        async with self.lock:
+            return round(self._size['BUY'] - self._size['SELL'], 8)
+    
+    async def get_average_price(self) -> float | None:
+        """
+        :return: The size-weighted average price of the open lots, or None when flat.
+        """
+        async with self.lock:
+            for side in ('BUY', 'SELL'):
+                if self._size[side] > self._epsilon:
+                    return self._notional[side] / self._size[side]
+            return None
+    
+    async def get_unrealized_pnl(self, mark_price: float) -> float:
+        """
+        :param mark_price: The price at which the open lots are valued.
+        :return: The unrealized PnL of the open lots.
+        """
+        async with self.lock:
+            return (self._size['BUY'] * mark_price - self._notional['BUY']) + (self._notional['SELL'] - self._size['SELL'] * mark_price)
+    
+    def _open(self, side: str, price: float, size: float):
+        self._lots[side].append(Lot(price=price, size=size))
+        self._size[side] = round(self._size[side] + size, 8)
+        self._notional[side] += price * size
+    
+    def _reset(self):
+        self._lots = {'BUY': deque(), 'SELL': deque()}
+        self._size = {'BUY': 0.0, 'SELL': 0.0}
+        self._notional = {'BUY': 0.0, 'SELL': 0.0}
+    
+    def get_sizes(self) -> Dict[str, float]:
+        """
+        Get the open size of each side without taking the lock, e.g. for metrics.
+        """
+        return dict(self._size)
+    
+    def __len__(self):
+        return len(self._lots['BUY']) + len(self._lots['SELL'])
     
     @inject
     def __init__(self,
+                 product_code: str,
                  config: dict = Provide['config']):
         """
         Initialize the PositionBook service.
-        This service can be extended to include methods for managing position book data.
+        :param product_code: The product whose positions are kept in this position book.
+        :param config: The application container configuration dictionary.
         """
         self.lock = asyncio.Lock()
         self.legal_currency_code = config.get('legal_currency_code')
-        self.crypto_currency_code = config.get('crypto_currency_code')
\ No newline at end of file
+        self.product_code = product_code
+        self._epsilon = 1e-9
+        self._reset()
\ No newline at end of file
@@ -1,3 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+
 import boto3
 
 from .exception import RuntimeException
@@ -11,7 +15,8 @@ class S3ClientException(RuntimeException):
 class S3Client:
     """
     A simple S3 client to interact with AWS S3 buckets.
-    This client provides methods to get objects from a specified S3 bucket.
+    This client provides methods to get, inspect and download objects from a specified S3 bucket.
+    The methods block, so they should be run in a thread from async code.
     """
     bucket: str = None
     _client: boto3.client = None
@@ -32,4 +37,99 @@ class S3Client:
             )
             return response
         except Exception as e:
-            raise S3ClientException(f"Getting object {key} from bucket {self._bucket}: {e}") from e
\ No newline at end of file
+            raise S3ClientException(f"Getting object {key} from bucket {self.bucket}: {e}") from e
+    
+    def upload_file(self, path: str, key: str) -> None:
+        """
+        Upload a file, in parallel parts if it is large.
+        :param path: The path of the file.
+        :param key: The key of the object to create.
+        """
+        try:
+            self._client.upload_file(path, self.bucket, key)
+        except Exception as e:
+            raise S3ClientException(f"Uploading {path} to object {key} in bucket {self.bucket}: {e}") from e
+    
+    def head_object(self, key: str, part_number: int = None) -> dict:
+        """
+        Get the metadata of an object without its body.
+        :param key: The key of the object.
+        :param part_number: If given, the metadata of that part of a multipart object, whose ContentLength is the part size.
+        :return: The response, with ContentLength and ETag among others.
+        """
+        params = {'Bucket': self.bucket, 'Key': key}
+        if part_number is not None:
+            params['PartNumber'] = part_number
+        try:
+            return self._client.head_object(**params)
+        except Exception as e:
+            raise S3ClientException(f"Getting metadata of object {key} from bucket {self.bucket}: {e}") from e
+    
+    def download(self, key: str, path: str, etag: str = None, chunk_size: int = 8 * 1024 * 1024, max_concurrency: int = 4) -> dict:
+        """
+        Download an object to a file with concurrent range reads and verify it against its ETag.
+        The file is written in place, so callers that need atomicity should download to a temporary path and rename it.
+        :param key: The key of the object.
+        :param path: The path of the file to write.
+        :param etag: The expected ETag. Reads are made with If-Match on it, so a concurrently replaced object fails the download
+            instead of mixing two versions. It is looked up when not given.
+        :param chunk_size: The size of each range read.
+        :param max_concurrency: The number of range reads in flight.
+        :return: The metadata of the downloaded object.
+        """
+        head = self.head_object(key)
+        if etag is not None and head['ETag'] != etag:
+            raise S3ClientException(f"Object {key} in bucket {self.bucket} changed: expected ETag {etag}, got {head['ETag']}")
+        etag = head['ETag']
+        size = head['ContentLength']
+        
+        def read_range(start: int) -> None:
+            end = min(start + chunk_size, size) - 1
+            try:
+                response = self._client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={start}-{end}", IfMatch=etag)
+                with open(path, 'r+b') as f:
+                    f.seek(start)
+                    for chunk in response['Body'].iter_chunks(1024 * 1024):
+                        f.write(chunk)
+            except Exception as e:
+                raise S3ClientException(f"Reading bytes {start}-{end} of object {key} from bucket {self.bucket}: {e}") from e
+        
+        with open(path, 'wb') as f:
+            f.truncate(size)
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            # Consuming the results re-raises the first failed read.
+            list(executor.map(read_range, range(0, size, chunk_size)))
+        
+        if os.path.getsize(path) != size:
+            raise S3ClientException(f"Size mismatch for object {key} from bucket {self.bucket}: expected {size}, got {os.path.getsize(path)}")
+        if head.get('ServerSideEncryption') != 'aws:kms' and 'SSECustomerAlgorithm' not in head:
+            self.verify(key, path, etag)
+        return head
+    
+    def verify(self, key: str, path: str, etag: str) -> None:
+        """
+        Check a downloaded file against the ETag of its object.
+        The ETag of a single part object is the MD5 of its body, and that of a multipart object is
+        the MD5 of the concatenated part MD5s followed by the number of parts.
+        Objects encrypted with SSE-KMS or SSE-C have opaque ETags, so `download` only checks their size.
+        :param key: The key of the object.
+        :param path: The path of the downloaded file.
+        :param etag: The ETag of the object.
+        """
+        expected = etag.strip('"')
+        if '-' in expected:
+            parts = int(expected.split('-')[1])
+            part_size = self.head_object(key, part_number=1)['ContentLength']
+            digests = b''
+            with open(path, 'rb') as f:
+                for _ in range(parts):
+                    digests += hashlib.md5(f.read(part_size)).digest()
+            actual = f"{hashlib.md5(digests).hexdigest()}-{parts}"
+        else:
+            digest = hashlib.md5()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            actual = digest.hexdigest()
+        if actual != expected:
+            raise S3ClientException(f"Checksum mismatch for object {key} from bucket {self.bucket}: expected {expected}, got {actual}")
\ No newline at end of file
@@ -0,0 +1,110 @@
+from typing import Callable, Dict, Iterator, List, TYPE_CHECKING
+import dataclasses
+import asyncio
+
+from dependency_injector.wiring import inject, Provide
+
+from .order_book import OrderBook
+from .position_book import PositionBook
+from .data_store import DataStore
+from .local_book import LocalBook
+from .metrics import MetricsRegistry
+
+if TYPE_CHECKING:
+    # Imported for type checking only, since agents depend on services.
+    from agents import Agent
+
+
+@dataclasses.dataclass
+class Shard:
+    """
+    The per-product state of the bot.
+    Every traded product gets its own order book, position book, data store, local book and agent,
+    while the WebSocket connection, the REST session and the portfolio are shared.
+    """
+    product_code: str
+    order_book: OrderBook
+    position_book: PositionBook
+    data_store: DataStore
+    local_book: LocalBook
+    agent: 'Agent'
+    halted: bool = False  # Set while the exchange reports the product as unhealthy, so that no decision is made
+
+
+class ShardRegistry:
+    """
+    Service that holds one `Shard` per traded product, keyed by product code.
+    The per-product services are built by the factories given by the application container.
+    """
+    _shards: Dict[str, Shard]
+    
+    async def sync(self):
+        """
+        Synchronize the order and position books of every product.
+        """
+        await asyncio.gather(
+            *[shard.order_book.sync() for shard in self],
+            *[shard.position_book.sync() for shard in self]
+        )
+    
+    @property
+    def product_codes(self) -> List[str]:
+        return list(self._shards)
+    
+    def get(self, product_code: str) -> Shard | None:
+        return self._shards.get(product_code)
+    
+    def __getitem__(self, product_code: str) -> Shard:
+        return self._shards[product_code]
+    
+    def __contains__(self, product_code: str) -> bool:
+        return product_code in self._shards
+    
+    def __iter__(self) -> Iterator[Shard]:
+        return iter(self._shards.values())
+    
+    def __len__(self):
+        return len(self._shards)
+    
+    @inject
+    def __init__(self,
+                 product_codes: List[str],
+                 order_book_factory: Callable[..., OrderBook],
+                 position_book_factory: Callable[..., PositionBook],
+                 data_store_factory: Callable[..., DataStore],
+                 local_book_factory: Callable[..., LocalBook],
+                 agent_factory: Callable[..., 'Agent'],
+                 metrics: MetricsRegistry = Provide['metrics']):
+        """
+        :param product_codes: The product codes to trade.
+        :param order_book_factory: Builds the order book of a product, given its product code.
+        :param position_book_factory: Builds the position book of a product, given its product code.
+        :param data_store_factory: Builds the data store of a product.
+        :param local_book_factory: Builds the local book of a product.
+        :param agent_factory: Builds the agent of a product, given its product code.
+        :param metrics: The registry of the order and position metrics.
+        """
+        self._shards = {
+            product_code: Shard(
+                product_code=product_code,
+                order_book=order_book_factory(product_code=product_code),
+                position_book=position_book_factory(product_code=product_code),
+                data_store=data_store_factory(),
+                local_book=local_book_factory(),
+                agent=agent_factory(product_code=product_code)
+            )
+            for product_code in product_codes
+        }
+        metrics.add_collector(lambda: self._collect_metrics(metrics))
+    
+    def _collect_metrics(self, metrics: MetricsRegistry) -> None:
+        active_orders = metrics.gauge('bot_active_orders', 'Active orders per product.', ('product_code',))
+        position_lots = metrics.gauge('bot_position_lots', 'Open position lots per product.', ('product_code',))
+        position_size = metrics.gauge('bot_position_size', 'Open position size per product and side.', ('product_code', 'side'))
+        halted = metrics.gauge('bot_product_halted', 'Whether decisions are halted per product.', ('product_code',))
+        for product_code, shard in list(self._shards.items()):
+            active_orders.labels(product_code).set(shard.order_book.count_active_orders())
+            position_lots.labels(product_code).set(len(shard.position_book))
+            for side, size in shard.position_book.get_sizes().items():
+                position_size.labels(product_code, side).set(size)
+            halted.labels(product_code).set(float(shard.halted))
\ No newline at end of file
@@ -1,3 +1,4 @@
+from typing import Dict
 import secrets
 import time
 import json
@@ -12,6 +13,11 @@ from websockets.asyncio.client import connect
 from dependency_injector.wiring import inject, Provide
 
 from .logger import Logger
+from .decoder import Decoder
+from .channel_queue import ChannelQueue
+from .latency import LatencyRecorder, MessageContext
+from .metrics import MetricsRegistry
+from .tick_recorder import TickRecorder
 from .handler_dispatcher import HandlerDispatcher
 
 
@@ -53,31 +59,128 @@ class Stream:
                 "id": f"subscribe_{channel}",
             }).encode(), text=True)
     
+    async def subscribe(self, channel: str):
+        """
+        Subscribe to a channel on the current connection.
+        Nothing is sent while disconnected; handlers are reset on the next connection instead.
+        :param channel: The channel to subscribe to.
+        """
+        if self._websocket is None:
+            return
+        await self._websocket.send(json.dumps({
+            "method": "subscribe",
+            "params": {
+                "channel": channel,
+            },
+            "id": f"subscribe_{channel}",
+        }).encode(), text=True)
+    
+    async def unsubscribe(self, channel: str):
+        """
+        Unsubscribe from a channel on the current connection.
+        :param channel: The channel to unsubscribe from.
+        """
+        if self._websocket is None:
+            return
+        await self._websocket.send(json.dumps({
+            "method": "unsubscribe",
+            "params": {
+                "channel": channel,
+            },
+            "id": f"unsubscribe_{channel}",
+        }).encode(), text=True)
+    
     async def receive_message(self, websocket: ClientConnection):
         """
-        Receive messages from the WebSocket and dispatch them to the handler dispatcher.
+        Receive messages from the WebSocket and enqueue them to the queue of their channel.
+        Handlers run on the consumers of the queues, so a slow handler does not stall reading the socket.
+        While the stream is paused, the socket keeps being drained: private messages are still handled,
+        but public messages are discarded, and handlers are reset on resume so that they rebuild their state from fresh data.
         """
         while True:
-            if not self.paused:
-                message = await websocket.recv()
-                message = json.loads(message)
-                
-                if 'params' in message and 'message' in message['params'] and 'channel' in message['params']:
-                    data = message['params']['message']
-                    channel = message['params']['channel']
-                    await self.handler_dispatcher.dispatch(data, channel)
-                    continue
-                
-                if 'id' in message and 'result' in message and message['result'] is True:
-                    if message['id'] == 'auth':
-                        await self.send_private_subscriptions(websocket)
-                    self.logger.system.info(f"WebSocket subscription successful for id: {message['id']}")
-                    continue
-                
-                if 'error' in message:
-                    self.logger.system.error(f"WebSocket error received (code: {message['error']['code']}): {message['error']['message']}")
-            else:
-                await asyncio.sleep(1)
+            message = await websocket.recv()
+            received_ns = time.perf_counter_ns()
+            if self.recorder is not None:
+                self.recorder.record(message)
+            frame = self.decoder.decode(message)
+            
+            if frame.channel is not None:
+                self._messages.labels(frame.channel).inc()
+                if frame.channel not in self.private_channels:
+                    if not self._resumed.is_set():
+                        self.discarded += 1
+                        self._stale = True
+                        continue
+                    if self._stale:
+                        self._stale = False
+                        await self.handler_dispatcher.reset()
+                context = MessageContext(frame.channel, received_ns, self.latency)
+                context.stamp('decode')
+                await self._get_queue(frame.channel).put(frame.message, frame.channel, context)
+                continue
+            
+            if frame.id is not None and frame.result is True:
+                if frame.id == 'auth':
+                    await self.send_private_subscriptions(websocket)
+                self.logger.system.info(f"WebSocket subscription successful for id: {frame.id}")
+                continue
+            
+            if frame.error is not None:
+                self.logger.system.error(f"WebSocket error received (code: {frame.error['code']}): {frame.error['message']}")
+    
+    def get_queue_metrics(self) -> Dict[str, dict]:
+        """
+        Get the depth, drop and lag metrics of every channel queue.
+        :return: A dictionary of metrics keyed by queue name.
+        """
+        return {name: queue.get_metrics() for name, queue in self._queues.items()}
+    
+    def _collect_metrics(self, metrics: MetricsRegistry) -> None:
+        metrics.counter('bot_messages_discarded_total', 'Public frames discarded while the stream was paused.').labels().value = self.discarded
+        metrics.gauge('bot_stream_paused', 'Whether the stream is paused.').labels().set(float(self.paused))
+        if self.recorder is not None:
+            recorder_metrics = self.recorder.get_metrics()
+            metrics.gauge('bot_tick_recorder_pending', 'Frames waiting for the tick recorder writer.').labels().set(recorder_metrics['pending'])
+            metrics.gauge('bot_tick_recorder_pending_bytes', 'Size of the frames waiting for the tick recorder writer.').labels().set(recorder_metrics['pending_bytes'])
+            metrics.counter('bot_tick_recorder_frames_total', 'Frames written by the tick recorder.').labels().value = recorder_metrics['recorded']
+            metrics.counter('bot_tick_recorder_dropped_total', 'Frames dropped because the tick recorder fell behind.').labels().value = recorder_metrics['dropped']
+            metrics.counter('bot_tick_recorder_segments_total', 'Tick segments closed.').labels().value = recorder_metrics['segments']
+            metrics.counter('bot_tick_recorder_uploads_total', 'Tick segments uploaded.').labels().value = recorder_metrics['uploaded']
+        depth = metrics.gauge('bot_channel_queue_depth', 'Messages pending per channel queue.', ('queue',))
+        lag = metrics.gauge('bot_channel_queue_lag_seconds', 'Queueing delay of the last consumed message per channel queue.', ('queue',))
+        dropped = metrics.counter('bot_channel_queue_dropped_total', 'Messages superseded by a snapshot or dropped on overflow per channel queue.', ('queue',))
+        overflows = metrics.counter('bot_channel_queue_overflows_total', 'Overflows of a full channel queue.', ('queue',))
+        for name, queue in list(self._queues.items()):
+            depth.labels(name).set(len(queue))
+            lag.labels(name).set(queue.lag)
+            dropped.labels(name).value = queue.dropped
+            overflows.labels(name).value = queue.overflows
+        handled = metrics.counter('bot_handler_messages_total', 'Messages dispatched to handlers per channel.', ('channel',))
+        handler_seconds = metrics.counter('bot_handler_seconds_total', 'Time spent in handlers per channel.', ('channel',))
+        handler_max = metrics.gauge('bot_handler_max_seconds', 'Longest handler run per channel.', ('channel',))
+        for channel, stats in self.handler_dispatcher.get_dispatch_metrics().items():
+            handled.labels(channel).value = stats['count']
+            handler_seconds.labels(channel).value = stats['count'] * stats['average_us'] / 1e6
+            handler_max.labels(channel).set(stats['max_us'] / 1e6)
+    
+    def _get_queue(self, channel: str) -> ChannelQueue:
+        """
+        Get the queue of a channel, creating it and starting its consumer on first use.
+        """
+        name = self.queue_names.get(channel, channel)
+        queue = self._queues.get(name)
+        if queue is None:
+            queue = self._queues[name] = ChannelQueue(
+                name=name,
+                consumer=self.handler_dispatcher.dispatch,
+                logger=self.logger,
+                conflated_channels=self.conflated_channels,
+                blocking_channels=self.blocking_channels,
+                overflow=self.handler_dispatcher.overflow,
+                max_size=self.queue_size
+            )
+            queue.start()
+        return queue
     
     async def run(self) -> None:
         """
@@ -86,25 +189,37 @@ class Stream:
         """
         self.logger.system.info("Starting WebSocket client...")
         async for websocket in connect(self.url):
+            if self._connected:
+                self._reconnects.inc()
+            self._connected = True
+            self._websocket = websocket
             try:
+                # Handlers are reset on every connection, since their state may have missed messages while disconnected.
                 await asyncio.gather(self.send_auth(websocket),
                                      self.send_public_subscriptions(websocket),
+                                     self.handler_dispatcher.reset(),
                                      self.receive_message(websocket))
             except ConnectionClosed:
                 self.logger.system.info("WebSocket connection closed.")
+            finally:
+                self._websocket = None
+    
+    @property
+    def paused(self) -> bool:
+        return not self._resumed.is_set()
     
     def pause(self):
         """
         Stop the stream.
         """
-        self.paused = True
+        self._resumed.clear()
         self.logger.system.info("The stream is paused.")
     
     def resume(self):
         """
         Resume the stream.
         """
-        self.paused = False
+        self._resumed.set()
         self.logger.system.info("The stream is resumed.")
     
     @inject
@@ -112,28 +227,64 @@ class Stream:
                  url: str,
                  api_key: str,
                  api_secret: str,
+                 queue_size: int = 10000,
                  handler_dispatcher: HandlerDispatcher = Provide['handler_dispatcher'],
+                 decoder: Decoder = Provide['decoder'],
                  logger: Logger = Provide['logger'],
+                 latency: LatencyRecorder = Provide['latency'],
+                 metrics: MetricsRegistry = Provide['metrics'],
+                 recorder: TickRecorder = Provide['tick_recorder'],
                  config: dict = Provide['config']):
         """
         Initialize the WebSocket client.
         :param url: The WebSocket URL to connect to.
         :param api_key: The API key for authentication.
         :param api_secret: The API secret for authentication.
+        :param queue_size: The maximum number of pending messages per channel queue.
         :param handler_dispatcher: The handler dispatcher service to handle incoming messages.
+        :param decoder: The decoder service to decode incoming frames.
+        :param latency: The recorder of the latency of each message through the pipeline.
+        :param metrics: The registry of the message, reconnection and queue metrics.
+        :param recorder: The recorder of the raw frames, used only when it is enabled.
         :param config: The application container configuration dictionary.
         """
         self.url = url
         self._api_key = api_key
         self._api_secret = api_secret
         self.handler_dispatcher = handler_dispatcher
+        self.decoder = decoder
         self.logger = logger
-        self.paused = False
+        self.latency = latency
+        self.recorder = recorder if recorder.enabled else None
+        self.queue_size = int(queue_size)
+        self.discarded = 0
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._stale = False
+        self._websocket = None
+        self._connected = False
+        self._messages = metrics.counter('bot_messages_total', 'Frames received per channel.', ('channel',))
+        self._reconnects = metrics.counter('bot_websocket_reconnects_total', 'WebSocket reconnections.').labels()
+        metrics.add_collector(lambda: self._collect_metrics(metrics))
+        self._queues: Dict[str, ChannelQueue] = {}
         
-        crypto_currency_code = config.get('crypto_currency_code')
+        crypto_currency_codes = config.get('crypto_currency_codes')
+        # Board snapshots are subscribed on demand by the board handler to (re)build its local books.
+        # Every product shares this connection.
         self.public_channels = [
-            f'lightning_board_snapshot_{crypto_currency_code}',
+            f'lightning_board_{crypto_currency_code}' for crypto_currency_code in crypto_currency_codes
         ]
         self.private_channels = [
             f'child_order_events',
-        ]
\ No newline at end of file
+        ]
+        # Every channel is consumed from its own queue, except board snapshots, which share the queue of the board diffs
+        # to keep their relative order. A snapshot supersedes the pending diffs, while order events are never dropped.
+        # Only order events may hold up the socket when their queue is full: a full board queue drops its pending diffs
+        # and has its handler resynchronize the book from a snapshot instead, so a slow consumer never stalls the order events.
+        self.queue_names = {
+            f'lightning_board_snapshot_{crypto_currency_code}': f'lightning_board_{crypto_currency_code}' for crypto_currency_code in crypto_currency_codes
+        }
+        self.conflated_channels = {
+            f'lightning_board_snapshot_{crypto_currency_code}' for crypto_currency_code in crypto_currency_codes
+        }
+        self.blocking_channels = set(self.private_channels)
\ No newline at end of file
@@ -0,0 +1,249 @@
+from typing import Deque, Tuple
+from collections import deque
+import datetime
+import os
+import threading
+import time
+import zlib
+
+from dependency_injector.wiring import inject, Provide
+
+from .logger import Logger
+from .s3client import S3Client
+
+
+class TickRecorder:
+    """
+    Service that records every raw WebSocket frame with its receive time, for replaying and for training offline.
+    Recording only appends the frame to a deque; a background thread writes the frames as `<unix time ns>\\t<frame>`
+    lines to append-only segment files. Each block of up to `block_bytes` is compressed as its own gzip member, so a
+    segment is a valid gzip file that `gzip.open` reads as a whole, and a crash loses at most the block being written.
+    Segments are named `ticks-<start time>.jsonl.gz`, written with an `.open` suffix until they are rotated by size or
+    age, and, when `upload` is set, uploaded to S3 under `upload_prefix` and removed once closed. Uploads run on a thread
+    of their own, so the writer keeps draining frames while a segment uploads.
+    """
+    _frames: Deque[Tuple[int, str|bytes]]
+    
+    def record(self, frame: str|bytes) -> None:
+        """
+        Record a raw frame, stamped with the current time.
+        This never blocks, and frames are dropped while more than `max_pending_bytes` are waiting for the writer.
+        :param frame: The frame as received from the WebSocket.
+        """
+        # Each byte counter is only written by one thread, so the difference is consistent without a lock.
+        if self._recorded_bytes - self._drained_bytes >= self.max_pending_bytes:
+            self.dropped += 1
+            return
+        self._recorded_bytes += len(frame)
+        self._frames.append((time.time_ns(), frame))
+    
+    def _write(self) -> None:
+        """
+        Write recorded frames until `close` is called, from the writer thread.
+        """
+        self._recover_segments()
+        self._upload_ready.set()
+        stopping = False
+        while not stopping:
+            stopping = self._stop.wait(self.flush_interval)
+            try:
+                self._drain()
+                if self._block and (stopping or time.monotonic() - self._block_started_at >= self.flush_interval):
+                    self._write_block()
+                if self._segment is not None and (stopping or self._should_rotate()):
+                    self._close_segment()
+                    self._upload_ready.set()
+            except Exception as e:
+                self.errors += 1
+                self.logger.system.error(f"Failed to record ticks: {e!r}")
+    
+    def _drain(self) -> None:
+        """
+        Move the recorded frames into the current block, writing every full block.
+        """
+        while self._frames:
+            received_ns, frame = self._frames.popleft()
+            self._drained_bytes += len(frame)
+            if isinstance(frame, bytes):
+                frame = frame.decode('utf-8', errors='replace')
+            # A raw newline in a JSON frame can only be whitespace, so replacing it keeps one frame per line.
+            line = f"{received_ns}\t{frame.replace(chr(10), ' ')}\n".encode()
+            if not self._block:
+                self._block_started_at = time.monotonic()
+            self._block.append(line)
+            self._block_size += len(line)
+            self.recorded += 1
+            if self._block_size >= self.block_bytes:
+                self._write_block()
+    
+    def _write_block(self) -> None:
+        """
+        Compress the current block as one gzip member and append it to the current segment.
+        """
+        if self._segment is None:
+            self._open_segment()
+        compressor = zlib.compressobj(self.compression_level, zlib.DEFLATED, 31)
+        data = compressor.compress(b''.join(self._block)) + compressor.flush()
+        self._segment.write(data)
+        self._segment.flush()
+        self._segment_size += len(data)
+        self._block = []
+        self._block_size = 0
+    
+    def _open_segment(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"ticks-{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')}.jsonl.gz"
+        self._segment_path = os.path.join(self.directory, name)
+        self._segment = open(f"{self._segment_path}.open", 'ab')
+        self._segment_size = 0
+        self._segment_opened_at = time.monotonic()
+    
+    def _should_rotate(self) -> bool:
+        return self._segment_size >= self.segment_bytes or time.monotonic() - self._segment_opened_at >= self.segment_interval
+    
+    def _close_segment(self) -> None:
+        self._segment.close()
+        os.replace(f"{self._segment_path}.open", self._segment_path)
+        self._segment = None
+        self.segments += 1
+    
+    def _recover_segments(self) -> None:
+        """
+        Close the segments left open by an earlier run that did not shut down cleanly.
+        Their complete blocks are readable, and only a block cut short by the crash is lost.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.startswith('ticks-') and name.endswith('.jsonl.gz.open'):
+                path = os.path.join(self.directory, name)
+                os.replace(path, path[:-len('.open')])
+    
+    def _upload(self) -> None:
+        """
+        Upload the closed segments whenever the writer closes one, from the uploader thread, until `close` is called.
+        """
+        stopping = False
+        while not stopping:
+            self._upload_ready.wait()
+            self._upload_ready.clear()
+            stopping = self._stop.is_set() and not self._writer_running()
+            try:
+                self._upload_closed_segments()
+            except Exception as e:
+                self.errors += 1
+                self.logger.system.error(f"Failed to upload tick segments: {e!r}")
+    
+    def _writer_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def _upload_closed_segments(self) -> None:
+        """
+        Upload and remove every closed segment, including those left by earlier runs. Failed uploads are retried on the next rotation.
+        """
+        for name in sorted(os.listdir(self.directory)) if os.path.isdir(self.directory) else []:
+            if not (name.startswith('ticks-') and name.endswith('.jsonl.gz')):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                self.s3client.upload_file(path, f"{self.upload_prefix}{name}")
+            except Exception as e:
+                self.logger.system.error(f"Failed to upload tick segment {name}: {e!r}")
+                return
+            os.remove(path)
+            self.uploaded += 1
+    
+    def start(self) -> None:
+        """
+        Start the writer thread, unless recording is disabled or already started.
+        """
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._write, name='tick_recorder', daemon=True)
+            self._thread.start()
+            if self.upload:
+                self._upload_thread = threading.Thread(target=self._upload, name='tick_recorder_upload', daemon=True)
+                self._upload_thread.start()
+    
+    def close(self) -> None:
+        """
+        Write the recorded frames, close the current segment and upload it.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=30)
+            if self._upload_thread is not None:
+                self._upload_ready.set()
+                self._upload_thread.join(timeout=30)
+                self._upload_thread = None
+            self._thread = None
+    
+    def get_metrics(self) -> dict:
+        return {
+            'pending': len(self._frames),
+            'pending_bytes': self._recorded_bytes - self._drained_bytes,
+            'recorded': self.recorded,
+            'dropped': self.dropped,
+            'segments': self.segments,
+            'uploaded': self.uploaded,
+            'errors': self.errors,
+        }
+    
+    @inject
+    def __init__(self,
+                 enabled: bool = False,
+                 directory: str = 'ticks',
+                 segment_bytes: int = 256 * 1024 * 1024,
+                 segment_interval: float = 3600,
+                 block_bytes: int = 1024 * 1024,
+                 flush_interval: float = 5.0,
+                 compression_level: int = 6,
+                 max_pending_bytes: int = 64 * 1024 * 1024,
+                 upload: bool = False,
+                 upload_prefix: str = 'ticks/',
+                 s3client: S3Client = Provide['s3client'],
+                 logger: Logger = Provide['logger']):
+        """
+        :param enabled: Whether frames are recorded at all.
+        :param directory: The directory of the segment files.
+        :param segment_bytes: The compressed size in bytes at which a segment is rotated.
+        :param segment_interval: The age in seconds at which a segment is rotated.
+        :param block_bytes: The uncompressed size in bytes of each compressed block.
+        :param flush_interval: The longest time in seconds a frame waits before it is written.
+        :param compression_level: The zlib compression level of the blocks.
+        :param max_pending_bytes: The size in bytes of the frames that may wait for the writer before frames are dropped.
+        :param upload: Whether closed segments are uploaded to S3 and removed.
+        :param upload_prefix: The S3 key prefix of the uploaded segments.
+        :param s3client: The S3 client to upload segments with.
+        :param logger: The logger service.
+        """
+        self.enabled = str(enabled).lower() in ('1', 'true', 'yes')
+        self.directory = directory
+        self.segment_bytes = int(segment_bytes)
+        self.segment_interval = float(segment_interval)
+        self.block_bytes = int(block_bytes)
+        self.flush_interval = float(flush_interval)
+        self.compression_level = int(compression_level)
+        self.max_pending_bytes = int(max_pending_bytes)
+        self.upload = str(upload).lower() in ('1', 'true', 'yes')
+        self.upload_prefix = upload_prefix
+        self.s3client = s3client
+        self.logger = logger
+        self._frames = deque()
+        self._block = []
+        self._block_size = 0
+        self._block_started_at = 0.0
+        self._segment = None
+        self._segment_path = None
+        self._segment_size = 0
+        self._segment_opened_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._upload_ready = threading.Event()
+        self._upload_thread = None
+        self._recorded_bytes = 0
+        self._drained_bytes = 0
+        self.recorded = 0
+        self.dropped = 0
+        self.segments = 0
+        self.uploaded = 0
+        self.errors = 0
\ No newline at end of file
@@ -0,0 +1,148 @@
+from typing import Dict, Optional
+from collections import deque
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+from dependency_injector.wiring import inject, Provide
+
+from .logger import Logger
+from .metrics import MetricsRegistry
+
+
+# Frames under this directory belong to the bot, and the innermost of them is blamed for a stall.
+_SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Watchdog:
+    """
+    Service that watches the event loop for stalls.
+    A heartbeat on the loop measures the loop lag every `interval_ms`. A monitor thread checks the heartbeat, and when
+    it is older than `threshold_ms`, samples the stack of the loop thread while it is still blocked. The stall is blamed
+    on the innermost frame of the bot's own code, e.g. the service method or handler that made a blocking call, and is
+    reported through the logger, the metrics and `get_report` once the loop runs again.
+    """
+    _beat: float
+    _sample: Optional[dict]
+    _stalls: deque
+    _culprits: Dict[str, dict]
+    
+    async def run(self) -> None:
+        """
+        Beat and measure the loop lag until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._monitor, name='watchdog', daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                started_at = loop.time()
+                await asyncio.sleep(self.interval)
+                lag = max(loop.time() - started_at - self.interval, 0.0)
+                self._beat = time.monotonic()
+                self.lag = lag
+                self.max_lag = max(self.max_lag, lag)
+                self._lag.set(lag)
+                self._lags.observe(lag)
+                
+                sample, self._sample = self._sample, None
+                if sample is not None and lag >= self.threshold:
+                    self._report(sample, lag)
+        finally:
+            self._stop.set()
+    
+    def _monitor(self) -> None:
+        """
+        Sample the stack of the loop thread once per stall, from the monitor thread.
+        """
+        check_interval = self.threshold / 2
+        sampled_beat = None
+        while not self._stop.wait(check_interval):
+            beat = self._beat
+            if time.monotonic() - beat < self.threshold or beat == sampled_beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            sampled_beat = beat
+            self._sample = {
+                'culprit': self._attribute(frame),
+                'stack': ''.join(traceback.format_stack(frame)),
+            }
+            del frame
+    
+    @staticmethod
+    def _attribute(frame) -> str:
+        """
+        Name the innermost frame of the bot's own code, as `path:qualified name`.
+        """
+        while frame is not None:
+            filename = os.path.abspath(frame.f_code.co_filename)
+            if filename.startswith(_SOURCE_DIR) and filename != os.path.abspath(__file__):
+                return f"{os.path.relpath(filename, _SOURCE_DIR)}:{frame.f_code.co_qualname}"
+            frame = frame.f_back
+        return 'unknown'
+    
+    def _report(self, sample: dict, lag: float) -> None:
+        culprit = sample['culprit']
+        stall = {
+            'time': time.time(),
+            'duration_ms': lag * 1000,
+            'culprit': culprit,
+            'stack': sample['stack'],
+        }
+        self._stalls.append(stall)
+        summary = self._culprits.setdefault(culprit, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        summary['count'] += 1
+        summary['total_ms'] += stall['duration_ms']
+        summary['max_ms'] = max(summary['max_ms'], stall['duration_ms'])
+        self._stall_count.labels(culprit).inc()
+        self.logger.system.warning(f"The event loop was blocked for {stall['duration_ms']:.1f} ms by {culprit}:\n{stall['stack']}")
+    
+    def get_report(self) -> dict:
+        """
+        Get the loop lag, the stalls per culprit and the most recent stalls with their stacks.
+        """
+        return {
+            'lag_ms': self.lag * 1000,
+            'max_lag_ms': self.max_lag * 1000,
+            'threshold_ms': self.threshold * 1000,
+            'culprits': {culprit: dict(summary) for culprit, summary in self._culprits.items()},
+            'stalls': list(self._stalls),
+        }
+    
+    @inject
+    def __init__(self,
+                 interval_ms: float = 50.0,
+                 threshold_ms: float = 100.0,
+                 max_stalls: int = 100,
+                 logger: Logger = Provide['logger'],
+                 metrics: MetricsRegistry = Provide['metrics']):
+        """
+        :param interval_ms: The interval of the heartbeat, at which the loop lag is measured.
+        :param threshold_ms: The time the loop must be blocked for to count as a stall.
+        :param max_stalls: The number of recent stalls kept for `get_report`.
+        :param logger: The logger service the stalls are reported to.
+        :param metrics: The registry of the loop lag and stall metrics.
+        """
+        self.interval = float(interval_ms) / 1000
+        self.threshold = float(threshold_ms) / 1000
+        self.logger = logger
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._beat = time.monotonic()
+        self._sample = None
+        self._stalls = deque(maxlen=int(max_stalls))
+        self._culprits = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._loop_thread_id = None
+        self._lag = metrics.gauge('bot_event_loop_lag_seconds', 'Last measured lag of the event loop.').labels()
+        self._lags = metrics.summary('bot_event_loop_lag_distribution_seconds', 'Distribution of the lag of the event loop.').labels()
+        self._stall_count = metrics.counter('bot_event_loop_stalls_total', 'Stalls of the event loop per culprit.', ('culprit',))
\ No newline at end of file
@@ -0,0 +1,38 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import logging
+
+import pytest
+from dependency_injector import containers, providers
+
+import services
+
+
+class _Logger:
+    """A logger service that logs through the standard loggers instead of files."""
+    system = logging.getLogger('System')
+    transaction = logging.getLogger('Transaction')
+
+
+class TestContainer(containers.DeclarativeContainer):
+    """A container with the shared services the tested services depend on. Other services are overridden by each test."""
+    config = providers.Configuration()
+    logger = providers.Object(_Logger())
+    metrics = providers.Singleton(services.MetricsRegistry)
+    event_bus = providers.Singleton(services.EventBus)
+    exchange_client = providers.Object(None)
+    inference = providers.Object(None)
+
+
+@pytest.fixture
+def container():
+    container = TestContainer()
+    container.config.from_dict({
+        'legal_currency_code': 'JPY',
+        'crypto_currency_codes': [],
+    })
+    container.wire(packages=[services])
+    yield container
+    container.unwire()
@@ -0,0 +1,13 @@
+import pytest
+
+import services
+
+
+def test_queue_policy_rejects_empty_queue(container):
+    with pytest.raises(ValueError):
+        services.DecisionGate(policy='queue', queue_size=0)
+
+
+def test_queue_policy_accepts_queue(container):
+    decision_gate = services.DecisionGate(policy='queue', queue_size='1')
+    assert decision_gate.queue_size == 1
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+import services
+from services.exchange_client import TransactionException
+
+
+async def _request_against(handler, **kwargs):
+    app = web.Application()
+    app.router.add_get('/v1/test', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    client = services.ExchangeClient(base_url=f'http://127.0.0.1:{port}', api_key='key', api_secret='secret')
+    try:
+        return await client._request('get', '/v1/test', **kwargs)
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def test_request_returns_body(container):
+    async def handler(request):
+        return web.json_response([{'currency_code': 'JPY', 'amount': 1.0}])
+    assert asyncio.run(_request_against(handler)) == [{'currency_code': 'JPY', 'amount': 1.0}]
+
+
+def test_request_raises_on_error_status(container):
+    async def handler(request):
+        return web.json_response({'status': -500, 'error_message': 'Invalid product', 'data': None}, status=400)
+    with pytest.raises(TransactionException):
+        asyncio.run(_request_against(handler))
+
+
+def test_request_raises_on_error_payload(container):
+    async def handler(request):
+        return web.json_response({'status': -1, 'error_message': 'Something went wrong', 'data': None})
+    with pytest.raises(TransactionException):
+        asyncio.run(_request_against(handler))
@@ -0,0 +1,18 @@
+import services
+
+
+def _snapshot(bid: float, ask: float) -> dict:
+    return {'mid_price': (bid + ask) / 2, 'bids': [{'price': bid, 'size': 1.0}], 'asks': [{'price': ask, 'size': 1.0}]}
+
+
+def test_apply_in_sync_diff():
+    local_book = services.LocalBook()
+    local_book.load_snapshot(_snapshot(15000000.0, 15000002.0))
+    assert local_book.apply({'mid_price': 15000000.5, 'bids': [{'price': 15000001.0, 'size': 0.1}], 'asks': []})
+
+
+def test_apply_detects_gap_on_low_priced_book():
+    local_book = services.LocalBook()
+    local_book.load_snapshot(_snapshot(80.000, 80.002))
+    # A missed diff moved the exchange book by a few ticks, far less than 1 JPY.
+    assert not local_book.apply({'mid_price': 80.011, 'bids': [], 'asks': [{'price': 80.003, 'size': 1.0}]})
@@ -0,0 +1,22 @@
+import asyncio
+
+import pytest
+
+import services
+
+
+@pytest.fixture
+def portfolio(container):
+    return services.Portfolio(config={'legal_currency_code': 'JPY', 'crypto_currency_codes': ['FX_BTC_JPY', 'BTC_JPY']})
+
+
+def test_margin_execution_moves_collateral_by_pnl_net_of_commission(portfolio):
+    asyncio.run(portfolio.apply_execution('FX_BTC_JPY', 'SELL', price=10000000.0, size=0.01, commission=0.00001, pnl=500.0))
+    assert asyncio.run(portfolio.get_collateral_amount()) == pytest.approx(400.0)
+    assert asyncio.run(portfolio.get_crypto_currency_amount('FX_BTC_JPY')) == 0.0
+
+
+def test_spot_execution_moves_balances(portfolio):
+    asyncio.run(portfolio.apply_execution('BTC_JPY', 'BUY', price=10000000.0, size=0.01, commission=0.00001))
+    assert asyncio.run(portfolio.get_legal_currency_amount()) == pytest.approx(-100000.0)
+    assert asyncio.run(portfolio.get_crypto_currency_amount('BTC_JPY')) == pytest.approx(0.00999)
@@ -0,0 +1,39 @@
+import asyncio
+
+from dependency_injector import providers
+
+import services
+
+
+class FakeExchangeClient:
+    """Answers like bitFlyer, whose getpositions only supports margin products."""
+    def __init__(self):
+        self.position_requests = []
+    
+    async def get_orders(self, symbol: str, order_state: str = None) -> list:
+        return []
+    
+    async def get_positions(self, symbol: str) -> list:
+        self.position_requests.append(symbol)
+        if not symbol.startswith('FX_'):
+            raise services.exchange_client.TransactionException(f"Request to /v1/me/getpositions failed for {symbol}")
+        return [{'product_code': symbol, 'side': 'BUY', 'price': 100.0, 'size': 0.5}]
+
+
+def test_sync_with_spot_and_margin_products(container):
+    exchange_client = FakeExchangeClient()
+    container.exchange_client.override(providers.Object(exchange_client))
+    shards = services.ShardRegistry(
+        product_codes=['BTC_JPY', 'FX_BTC_JPY'],
+        order_book_factory=providers.Factory(services.OrderBook),
+        position_book_factory=providers.Factory(services.PositionBook),
+        data_store_factory=providers.Factory(services.DataStore, max_size=3),
+        local_book_factory=providers.Factory(services.LocalBook),
+        agent_factory=lambda product_code: None
+    )
+    
+    asyncio.run(shards.sync())
+    
+    assert exchange_client.position_requests == ['FX_BTC_JPY']
+    assert len(shards['BTC_JPY'].position_book) == 0
+    assert shards['FX_BTC_JPY'].position_book.get_sizes()['BUY'] == 0.5